@@ -0,0 +1,174 @@
+# analytics.py
+"""Séries derivadas pré-calculadas (retornos, médias móveis e ajustes).
+
+Cada função é calculada uma vez por versão dos dados e memoizada com
+`shared_dataset(max_entries=...)`, que descarta as entradas mais antigas e
+entrega o mesmo resultado a todas as sessões, sem cópia (ver dataplane.py).
+Os gráficos recebem os resultados prontos em vez de recalcular a cada rerun.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from dataplane import shared_dataset
+from instrumentation import cache_probe, track_cache
+
+ROLLING_WINDOWS = (3, 6, 12)
+
+# Mesma fração padrão usada pelo trendline="lowess" do Plotly
+LOWESS_FRAC = 2 / 3
+
+# Pontos por série enviados ao navegador (acima disso a série é reduzida)
+MAX_CHART_POINTS = 2000
+
+
+def data_version(df: pd.DataFrame) -> str:
+    """Hash curto do conteúdo do DataFrame, usado como chave de cache."""
+    hashes = pd.util.hash_pandas_object(df, index=True).values
+    return hashlib.sha1(hashes.tobytes()).hexdigest()[:12]
+
+
+@track_cache("pct_returns")
+@shared_dataset(max_entries=16)
+@cache_probe("pct_returns")
+def pct_returns(version: str, _df: pd.DataFrame) -> pd.DataFrame:
+    """Variação percentual período a período (%)."""
+    return _df.pct_change().dropna() * 100
+
+
+@track_cache("rolling_means")
+@shared_dataset(max_entries=16)
+@cache_probe("rolling_means")
+def rolling_means(version: str, _df: pd.DataFrame, windows: tuple = ROLLING_WINDOWS) -> pd.DataFrame:
+    """Médias móveis de todas as colunas para várias janelas de uma vez.
+
+    Returns:
+        pd.DataFrame: Colunas em dois níveis (janela, coluna original),
+            ex: `rolling_means(v, df)[3]['Soja']`
+    """
+    return pd.concat({w: _df.rolling(w).mean() for w in windows}, axis=1)
+
+
+@track_cache("linear_fit")
+@st.cache_data(max_entries=32, show_spinner=False)
+@cache_probe("linear_fit")
+def linear_fit(version: str, x: str, y: str, _df: pd.DataFrame) -> dict:
+    """Regressão linear (mínimos quadrados) de `y` em função de `x`.
+
+    Equivale ao trendline="ols" do Plotly, mas com numpy em vez do statsmodels.
+
+    Returns:
+        dict: `x`/`y` da reta (extremos), `slope`, `intercept` e `r2`
+    """
+    dados = _df[[x, y]].dropna().to_numpy(dtype=float)
+    if len(dados) < 2 or np.ptp(dados[:, 0]) == 0:
+        return {"x": [], "y": [], "slope": np.nan, "intercept": np.nan, "r2": np.nan}
+
+    xs, ys = dados[:, 0], dados[:, 1]
+    slope, intercept = np.polyfit(xs, ys, 1)
+    residuos = ys - (slope * xs + intercept)
+    total = ((ys - ys.mean()) ** 2).sum()
+    r2 = 1 - (residuos ** 2).sum() / total if total else 1.0
+
+    extremos = np.array([xs.min(), xs.max()])
+    return {
+        "x": extremos.tolist(),
+        "y": (slope * extremos + intercept).tolist(),
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "r2": float(r2),
+    }
+
+
+@track_cache("lowess_fit")
+@shared_dataset(max_entries=32)
+@cache_probe("lowess_fit")
+def lowess_fit(version: str, x: str, y: str, _df: pd.DataFrame, frac: float = LOWESS_FRAC) -> pd.DataFrame:
+    """Curva LOWESS de `y` em função de `x`, ordenada por `x`."""
+    from statsmodels.nonparametric.smoothers_lowess import lowess
+
+    dados = _df[[x, y]].dropna()
+    if len(dados) < 3:
+        return pd.DataFrame({x: [], y: []})
+    curva = lowess(dados[y].to_numpy(dtype=float), dados[x].to_numpy(dtype=float), frac=frac)
+    return pd.DataFrame(curva, columns=[x, y])
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: índices dos `n_out` pontos que preservam
+    a forma visual da série (picos e vales incluídos). Primeiro e último ponto
+    são sempre mantidos.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # n_out - 2 baldes entre o primeiro e o último ponto
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        prox_fim = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:prox_fim].mean(), y[end:prox_fim].mean()
+        # Área do triângulo (ponto escolhido anterior, candidato, média do próximo balde)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Mínimo e máximo de cada balde (vetorizado); mais barato que o LTTB."""
+    n = len(y)
+    buckets = n_out // 2
+    if n_out >= n or buckets < 1:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    size = n // buckets
+    blocos = y[:buckets * size].reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    idx = np.concatenate([offsets + blocos.argmin(axis=1), offsets + blocos.argmax(axis=1), [0, n - 1]])
+    return np.unique(idx)
+
+
+@track_cache("downsample")
+@shared_dataset(max_entries=32)
+@cache_probe("downsample")
+def downsample(version: str, _df: pd.DataFrame, max_points: int = MAX_CHART_POINTS,
+               method: str = "lttb") -> pd.DataFrame:
+    """Reduz cada coluna a ~`max_points` pontos antes de montar o gráfico.
+
+    As linhas mantidas são a união das escolhidas em cada coluna, então todas as
+    séries continuam alinhadas no mesmo eixo x (necessário para áreas empilhadas).
+
+    Args:
+        version (str): Versão dos dados + recorte visível (chave do cache)
+        _df (pd.DataFrame): Séries em colunas, índice ordenado (datas ou números)
+        max_points (int, optional): Alvo por série. Defaults to MAX_CHART_POINTS.
+        method (str, optional): "lttb" ou "minmax". Defaults to "lttb".
+    """
+    if len(_df) <= max_points:
+        return _df
+
+    x = _df.index.to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    x = x.astype(float)
+
+    manter = set()
+    for col in _df.columns:
+        y = _df[col].to_numpy(dtype=float)
+        validos = np.flatnonzero(~np.isnan(y))
+        if method == "minmax":
+            escolhidos = minmax_indices(y[validos], max_points)
+        else:
+            escolhidos = lttb_indices(x[validos], y[validos], max_points)
+        manter.update(validos[escolhidos].tolist())
+    return _df.iloc[sorted(manter)]
@@ -1,46 +1,377 @@
+import asyncio
+import threading
+import time
 import requests
 import pandas as pd
+from concurrent.futures import Future
 from datetime import datetime
+from typing import Optional
+from requests.adapters import HTTPAdapter
 import streamlit as st
 from config import Config
+from eventloop import event_loop
+from instrumentation import cache_probe, stage, timed, track_cache
+from jsonstream import read_series
+from refresher import refresher
+from storage import timeseries_store
 
-@st.cache_data(
-    ttl=3600,  # Cache de 1 hora
-    show_spinner="Buscando dados da API..."
+def _build_session() -> requests.Session:
+    """Sessão HTTP compartilhada: reaproveita conexões TLS entre chamadas."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.API_MAX_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_session = _build_session()
+
+class RateLimitError(Exception):
+    """Cota da API esgotada (fila excedeu o tempo máximo ou a API recusou)."""
+
+class TokenBucket:
+    """Limitador token bucket: `capacity` chamadas a cada `period` segundos."""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Consome um token e retorna quanto tempo esperar até ele valer."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1  # Saldo negativo = fila de espera
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def _release(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def acquire(self, timeout: float = None) -> None:
+        acquire_all([self], timeout)
+
+def acquire_all(buckets, timeout: float = None) -> None:
+    """Um token de cada bucket, esperando uma vez pelo mais demorado.
+
+    Os tokens são reservados em todos os buckets antes de qualquer espera: se
+    algum excederia `timeout`, todos são devolvidos na hora (uma chamada
+    recusada não consome cota nem dorme no bucket do minuto para então
+    esbarrar no do dia).
+
+    Raises:
+        RateLimitError: Algum bucket excederia `timeout`
+    """
+    waits = [bucket._reserve() for bucket in buckets]
+    wait = max(waits, default=0.0)
+    if timeout is not None and wait > timeout:
+        for bucket in buckets:
+            bucket._release()
+        raise RateLimitError(f"Cota esgotada: próxima chamada liberada em {wait:.0f}s")
+    if wait:
+        time.sleep(wait)
+
+class RequestScheduler:
+    """Agenda as chamadas à API para todo o processo.
+
+    Features:
+    - Coalescência: chamadas idênticas em andamento compartilham uma única requisição
+    - Token bucket por minuto e por dia (cotas definidas em Config)
+    - Excesso entra em fila em vez de falhar (até `queue_timeout` segundos)
+    """
+
+    def __init__(self, per_minute: int, per_day: int, queue_timeout: float = None):
+        self.buckets = [TokenBucket(per_minute, 60), TokenBucket(per_day, 24 * 3600)]
+        self.queue_timeout = queue_timeout
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: str, func, *args):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            # Outra sessão já está buscando o mesmo recurso: aguarda o resultado
+            return future.result()
+
+        try:
+            acquire_all(self.buckets, self.queue_timeout)
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+# Tamanho dos blocos lidos da resposta (parse em streaming, ver jsonstream.py)
+CHUNK_SIZE = 1 << 16
+
+scheduler = RequestScheduler(
+    per_minute=Config.API_CALLS_PER_MINUTE,
+    per_day=Config.API_CALLS_PER_DAY,
+    queue_timeout=Config.API_QUEUE_TIMEOUT
 )
 
+@track_cache("fetch_commodity_data")
 def fetch_commodity_data(commodity: str) -> pd.DataFrame:
-    api_key = Config.ALPHA_VANTAGE_KEY
     """Obtém dados de commodities com tratamento robusto de erros.
-    
+
     Features:
-    - Cache automático
-    - Fallback para dados mock
-    - Timeout para evitar travamentos
+    - Cache automático (por versão do histórico: reflete a última atualização);
+      resultados de fallback valem só `Config.API_RETRY_SECONDS`
+    - Histórico persistido em disco (leitura sem rede enquanto existir)
+    - Atualização em segundo plano antes do vencimento (stale-while-revalidate)
+    - Atualização incremental: só as datas novas são anexadas ao histórico
+    - Fallback para histórico local e, em último caso, dados mock
+    - Timeout para evitar travamentos: o script espera no máximo
+      `Config.API_WAIT_TIMEOUT` e o download continua em segundo plano
     """
+    df, aviso = _fetch_commodity_data(commodity, timeseries_store.version(commodity))
+    _show_notices([aviso])
+    return df
+
+def _failure_notice(e: Exception, prefixo: str = "") -> tuple:
+    """(nível do st, mensagem) para a falha de uma busca."""
+    if isinstance(e, TimeoutError):
+        return "info", f"⏳ {prefixo}API lenta ({str(e)}): usando histórico local até o download terminar..."
+    if isinstance(e, RateLimitError):
+        return "warning", f"⏳ {prefixo}Limite da API atingido: {str(e)}"
+    if isinstance(e, requests.exceptions.RequestException):
+        return "error", f"⛔ {prefixo}Falha na conexão: {str(e)}"
+    return "error", f"{prefixo}Erro inesperado: {str(e)}"
+
+def _show_notices(avisos) -> None:
+    # Fora das funções em cache: o st.cache_data repetiria as mensagens a cada
+    # rerun enquanto a entrada valesse, mesmo depois de o dado chegar
+    for aviso in avisos:
+        if aviso:
+            nivel, mensagem = aviso
+            getattr(st, nivel)(mensagem)
+
+# ttl: uma falha não grava o histórico (a versão não muda), então sem prazo o
+# fallback ficaria em cache até o processo reiniciar
+@st.cache_data(max_entries=64, ttl=Config.API_RETRY_SECONDS, show_spinner="Buscando dados da API...")
+@cache_probe("fetch_commodity_data")
+def _fetch_commodity_data(commodity: str, version: str) -> tuple:
+    """(DataFrame, aviso ou None)."""
     try:
-        url = f"https://www.alphavantage.co/query?function={commodity}&interval=monthly&apikey={api_key}"
-        
-        # Adicione timeout (10 segundos conexão, 30 segundos leitura)
-        response = requests.get(url, timeout=(10, 30)).json()
-        
-        if not response.get("data"):
-            st.warning("⚠️ Dados não encontrados na API. Usando dados simulados...")
-            return generate_mock_data()
-            
-        # Processamento seguro
-        df = pd.DataFrame(response["data"])
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df['value'] = pd.to_numeric(df['value'], errors='coerce').ffill()
-        
-        return df.dropna().sort_values('date')
-        
-    except requests.exceptions.RequestException as e:
-        st.error(f"⛔ Falha na conexão: {str(e)}")
-        return generate_mock_data()
+        df = event_loop.run(load_commodity_async(commodity), Config.API_WAIT_TIMEOUT)
     except Exception as e:
-        st.error(f"Erro inesperado: {str(e)}")
-        return generate_mock_data()
+        return _fallback_data(commodity), _failure_notice(e)
+    if df is None:
+        return generate_mock_data(), ("warning", "⚠️ Dados não encontrados na API. Usando dados simulados...")
+    return df, None
+
+def fetch_many(commodities: list, max_workers: int = None) -> pd.DataFrame:
+    """Busca várias commodities em paralelo e alinha as séries pela data.
+
+    Args:
+        commodities (list): Funções da Alpha Vantage (ex: ["WHEAT", "CORN"])
+        max_workers (int, optional): Limite de requisições simultâneas.
+            Defaults to Config.API_MAX_WORKERS.
+
+    Returns:
+        pd.DataFrame: Tabela larga indexada por `date`, uma coluna por commodity
+    """
+    commodities = tuple(dict.fromkeys(commodities))  # Remove duplicadas
+    versions = tuple(timeseries_store.version(c) for c in commodities)
+    wide, avisos = _fetch_many(commodities, max_workers, versions)
+    _show_notices(avisos)
+    return wide
+
+@st.cache_data(max_entries=32, ttl=Config.API_RETRY_SECONDS, show_spinner="Buscando dados da API...")
+def _fetch_many(commodities: tuple, max_workers: int, versions: tuple) -> tuple:
+    """(tabela larga, avisos)."""
+    if not commodities:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='date')), []
+
+    resultados = event_loop.run(fetch_many_async(commodities, max_workers, Config.API_WAIT_TIMEOUT))
+    series, avisos = {}, []
+    for commodity, resultado in resultados.items():
+        if isinstance(resultado, BaseException):
+            df = _fallback_data(commodity)
+            avisos.append(_failure_notice(resultado, prefixo=f"{commodity}: "))
+        elif resultado is None:
+            df = generate_mock_data()
+            avisos.append(("warning", f"⚠️ {commodity}: dados não encontrados na API. Usando dados simulados..."))
+        else:
+            df = resultado
+        series[commodity] = df.set_index('date')['value']
+
+    wide = pd.concat(series, axis=1).sort_index()
+    wide.index.name = 'date'
+    return wide, avisos
+
+async def load_commodity_async(commodity: str) -> Optional[pd.DataFrame]:
+    """`_load_commodity` sem bloquear o loop (roda no executor do loop).
+
+    Cancelar a espera não interrompe um download já iniciado: ele termina
+    (limitado pelos timeouts de conexão/leitura) e grava o histórico, que os
+    próximos reruns encontram pela versão do armazenamento.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _load_commodity, commodity)
+
+async def fetch_many_async(commodities, max_workers: int = None, timeout: float = None) -> dict:
+    """Busca várias commodities ao mesmo tempo, no máximo `max_workers` por vez.
+
+    Vencido o `timeout`, as buscas pendentes são canceladas: as que ainda
+    esperavam vaga nem chegam a fazer a requisição.
+
+    Returns:
+        dict: commodity -> DataFrame (None se vazia na API) ou a exceção da
+            busca (TimeoutError para as que não terminaram no prazo)
+    """
+    limite = asyncio.Semaphore(max_workers or Config.API_MAX_WORKERS)
+
+    async def buscar(commodity):
+        async with limite:
+            return await load_commodity_async(commodity)
+
+    tarefas = {commodity: asyncio.ensure_future(buscar(commodity)) for commodity in commodities}
+    pendentes = set()
+    try:
+        if tarefas:
+            _, pendentes = await asyncio.wait(tarefas.values(), timeout=timeout)
+    finally:
+        for tarefa in tarefas.values():
+            tarefa.cancel()  # Sem efeito nas concluídas
+
+    resultados = {}
+    for commodity, tarefa in tarefas.items():
+        if tarefa in pendentes:
+            resultados[commodity] = TimeoutError(f"sem resposta em {timeout:g}s")
+        else:
+            resultados[commodity] = tarefa.exception() or tarefa.result()
+    return resultados
+
+_prefetching = {}
+_prefetching_lock = threading.Lock()
+
+def prefetch_commodity(commodity: str) -> Future:
+    """Inicia a carga da commodity no loop sem esperar (uma por processo).
+
+    Novas tentativas depois de uma falha ficam com o `refresher`, que já
+    aplica backoff: a commodity passa a ser monitorada na primeira carga.
+
+    Returns:
+        Future: Resultado de `load_commodity_async`; o script consulta `done()`
+            nos reruns seguintes em vez de bloquear
+    """
+    with _prefetching_lock:
+        if commodity not in _prefetching:
+            _prefetching[commodity] = event_loop.submit(load_commodity_async(commodity))
+        return _prefetching[commodity]
+
+def _load_commodity(commodity: str) -> pd.DataFrame:
+    """Histórico local sempre que existir; a rede só é usada na primeira carga.
+
+    Histórico vencido é devolvido mesmo assim e a atualização fica com a thread
+    de segundo plano. Erros de rede são propagados para o chamador decidir o fallback.
+    """
+    watch_commodity(commodity)
+    stored = timeseries_store.read(commodity)
+    if stored is not None:
+        if not timeseries_store.is_fresh(commodity):
+            refresher.trigger()
+        return stored
+
+    # Sessões simultâneas pedindo a mesma commodity disparam uma só requisição
+    return scheduler.run(commodity, _refresh_commodity, commodity)
+
+def watch_commodity(commodity: str) -> None:
+    """Inclui a commodity na atualização em segundo plano.
+
+    A tarefa vence `Config.REFRESH_AHEAD_SECONDS` antes do histórico expirar, então
+    a atualização normalmente termina antes de alguém encontrar o dado velho.
+    """
+    if refresher.is_registered(commodity):
+        return
+    max_age = max(Config.COMMODITY_REFRESH_SECONDS - Config.REFRESH_AHEAD_SECONDS, 0)
+    refresher.register(
+        commodity,
+        lambda: _background_refresh(commodity),
+        is_due=lambda: not timeseries_store.is_fresh(commodity, max_age)
+    )
+    refresher.start()
+
+def _background_refresh(commodity: str) -> None:
+    if scheduler.run(commodity, _refresh_commodity, commodity) is None:
+        # Falha = nova tentativa com backoff, sem gastar a cota a cada ciclo
+        raise LookupError(f"{commodity}: dados não encontrados na API")
+
+def _refresh_commodity(commodity: str) -> pd.DataFrame:
+    df = _download_commodity(commodity)
+    if df is None:
+        return timeseries_store.read(commodity)
+    with stage("api:merge"):
+        return timeseries_store.merge(commodity, df)
+
+@timed("api:download")
+def _download_commodity(commodity: str) -> pd.DataFrame:
+    """Baixa e normaliza a série mensal da Alpha Vantage (None se vier vazia)."""
+    # Timeout por chamada (conexão, leitura)
+    timeout = (Config.API_CONNECT_TIMEOUT, Config.API_READ_TIMEOUT)
+    with stage("api:http"):
+        response = _session.get(commodity_url(commodity), timeout=timeout, stream=True)
+    with stage("api:parse"), response:
+        return parse_commodity_stream(response.iter_content(CHUNK_SIZE))
+
+def commodity_url(commodity: str, base_url: str = None) -> str:
+    """URL da série mensal da commodity (ex: "WHEAT")."""
+    base_url = (base_url or Config.API_BASE_URL).rstrip("/")
+    return f"{base_url}/query?function={commodity}&interval=monthly&apikey={Config.ALPHA_VANTAGE_KEY}"
+
+def parse_commodity_response(response: dict) -> Optional[pd.DataFrame]:
+    """Normaliza a resposta JSON em (date, value) ordenado por data (None se vier vazia).
+
+    Raises:
+        RateLimitError: A API respondeu com o aviso de cota excedida
+    """
+    # A Alpha Vantage responde 200 com um aviso quando a cota é excedida
+    aviso = response.get("Note") or response.get("Information")
+    if aviso and not response.get("data"):
+        raise RateLimitError(aviso)
+
+    if not response.get("data"):
+        return None
+
+    # Processamento seguro
+    df = pd.DataFrame(response["data"])
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    df['value'] = pd.to_numeric(df['value'], errors='coerce').ffill()
+
+    return df.dropna().sort_values('date')
+
+def parse_commodity_stream(chunks) -> Optional[pd.DataFrame]:
+    """Mesmo resultado de `parse_commodity_response`, lendo a resposta em blocos.
+
+    As colunas saem direto dos arrays tipados, sem a lista de dicts intermediária.
+    """
+    dates, values, metadata = read_series(chunks)
+    if not len(dates):
+        # Sem itens: aviso de cota ou resposta vazia
+        return parse_commodity_response(metadata)
+
+    df = pd.DataFrame({'date': dates, 'value': values})
+    df['value'] = df['value'].ffill()
+
+    return df.dropna().sort_values('date')
+
+def _fallback_data(commodity: str) -> pd.DataFrame:
+    # Histórico local desatualizado ainda é melhor que dados simulados
+    stored = timeseries_store.read(commodity)
+    return stored if stored is not None else generate_mock_data()
 
 def generate_mock_data():
     """Gera dados fictícios para manter o funcionamento do dashboard"""
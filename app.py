@@ -3,14 +3,19 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 from datetime import datetime
-from io import BytesIO
-import requests
-import json
-import geopandas as gpd
-import zipfile
-import folium
-from streamlit_folium import st_folium
-from branca.colormap import LinearColormap
+from exports import DATAFRAME_FORMATS, GEO_FORMATS, dataframe_export, geodata_export
+from geodata import (DEFAULT_LEVEL, SIMPLIFICATION_LEVELS, build_geodata, geodata_is_stale,
+                     geodata_version, level_for_zoom, load_state_geojson, publish_geodata)
+from maps import build_base_map, build_state_layer, period_classes, render_map
+from storage import timeseries_store
+from analytics import data_version, downsample, linear_fit, lowess_fit, pct_returns, rolling_means
+from dataplane import enable_copy_on_write, shared_dataset
+from api_connector import prefetch_commodity, watch_commodity
+from refresher import refresher
+from config import Config
+from instrumentation import cache_probe, render_debug_panel, stage, start_rerun, track_cache
+from spatial import municipal_yields, points_version, region_at, region_index, regional_yields
+from charts import PAGE_SIZE, create_price_table, page_count
 
 # Configuração da página
 st.set_page_config(
@@ -19,36 +24,23 @@ st.set_page_config(
     page_icon="🚜",
     initial_sidebar_state="collapsed"
 )
+start_rerun()  # Instrumentação opcional (AGROTECH_INSTRUMENTATION=1)
+# Copy-on-Write do pandas para o processo inteiro, antes de qualquer dataset:
+# os shared_dataset entregam visões rasas que só isolam as sessões com ele
+enable_copy_on_write()
 
 # --- Dados Geoespaciais Enriquecidos ---
-@st.cache_data
-def load_geodata():
-    """Carrega dados geoespaciais com tratamento de erros robusto"""
+@track_cache("load_geodata")
+def load_geodata(level=DEFAULT_LEVEL):
+    """Carrega as geometrias estaduais do índice local pré-processado (somente leitura)"""
+    return _load_geodata(level, geodata_version())
+
+@shared_dataset(max_entries=8)
+@cache_probe("load_geodata")
+def _load_geodata(level, version):
     try:
-        # GeoJSON alternativo (com propriedades garantidas)
-        geojson_url = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
-        estados_geo = requests.get(geojson_url).json()
-        
-        # Dados de exemplo (substitua pelos seus)
-        produtividade = {
-            "AC": 50.0, "AL": 48.0, "AP": 52.0, "AM": 55.0,
-            "BA": 48.9, "CE": 47.0, "DF": 60.0, "ES": 53.0,
-            "GO": 59.1, "MA": 46.0, "MT": 60.5, "MS": 61.2,
-            "MG": 52.3, "PA": 49.0, "PB": 47.5, "PR": 58.2,
-            "PE": 48.0, "PI": 47.0, "RJ": 54.0, "RN": 47.0,
-            "RS": 55.8, "RO": 53.0, "RR": 51.0, "SC": 57.0,
-            "SP": 56.7, "SE": 48.5, "TO": 50.0
-        }
-
-        # Padroniza propriedades
-        for feature in estados_geo['features']:
-            estado_id = feature['properties']['sigla']  # Agora usando 'sigla'
-            feature['properties'].update({
-                'produtividade': produtividade.get(estado_id, 0),
-                'nome': feature['properties'].get('name', '')
-            })
-
-        return estados_geo
+        # GeoJSON simplificado gerado a partir de dados.shp (python geodata.py)
+        return load_state_geojson(level)
 
     except Exception as e:
         st.error(f"Erro ao carregar dados geográficos: {str(e)}")
@@ -58,23 +50,10 @@ def load_geodata():
             "features": []
         }
 
-estados_geo = load_geodata()
-
-# Mapeamento de tiles e suas atribuições
-TILE_LAYERS = {
-    "OpenStreetMap": {
-        "tiles": "OpenStreetMap",
-        "attr": '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
-    },
-    "CartoDB DarkMatter": {
-        "tiles": "CartoDB dark_matter",
-        "attr": '&copy; <a href="https://www.carto.com/attributions">CARTO</a>'
-    },
-    "Stamen Terrain": {
-        "tiles": "Stamen Terrain",
-        "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>, under <a href="http://creativecommons.org/licenses/by/3.0">CC BY 3.0</a>. Data by <a href="http://openstreetmap.org">OpenStreetMap</a>, under <a href="http://www.openstreetmap.org/copyright">ODbL</a>.'
-    }
-}
+@st.cache_resource(max_entries=8, show_spinner=False)
+def static_geometry(level, version):
+    """Geometria do nível publicada em app/static (baixada pelo navegador uma vez por versão)"""
+    return publish_geodata(level)
 
 # Configuração de estado (adicionar logo abaixo dos imports)
 if 'filtros' not in st.session_state:
@@ -177,10 +156,13 @@ hr {
 """, unsafe_allow_html=True)
 
 # --- Dados REAIS com apresentação aprimorada ---
-@st.cache_data
-def load_data():
+DASHBOARD_COMMODITIES = ["Soja", "Milho", "Café"]
+
+@st.cache_resource
+def seed_sample_prices():
+    """Grava os preços de exemplo no armazenamento local na primeira execução"""
     dates = pd.date_range(start="2023-01-01", periods=12, freq='M')
-    return pd.DataFrame({
+    exemplos = {
         # Soja (R$/sc 60kg) - Valores reais formatados
         "Soja": [178.50, 182.30, 185.20, 188.50, 192.00, 195.80, 
                  200.50, 205.20, 210.00, 215.50, 220.80, 225.30],
@@ -190,10 +172,70 @@ def load_data():
         # Café (R$/sc 60kg) - Valores reais formatados
         "Café": [1200.00, 1225.50, 1252.30, 1270.75, 1295.90, 1310.20,
                  1335.00, 1360.50, 1385.75, 1410.30, 1435.90, 1460.20],
-        "Data": dates
-    }).set_index('Data')
+    }
+    for commodity, values in exemplos.items():
+        if not timeseries_store.exists(commodity):
+            timeseries_store.append(commodity, pd.DataFrame({'date': dates, 'value': values}))
+
+@track_cache("load_data")
+@shared_dataset(max_entries=4)
+@cache_probe("load_data")
+def load_data(version):
+    """Histórico completo das commodities do painel (lido do armazenamento colunar)"""
+    return timeseries_store.query_wide(DASHBOARD_COMMODITIES)
+
+@track_cache("query_prices")
+@shared_dataset(max_entries=32)
+@cache_probe("query_prices")
+def query_prices(commodities, start, end, version):
+    """Recorte (commodities, período) com o filtro aplicado na leitura"""
+    return timeseries_store.query_wide(list(commodities), start, end)
+
+@track_cache("tabela_precos")
+@st.cache_resource(max_entries=64, show_spinner=False)
+@cache_probe("tabela_precos")
+def price_table_page(commodities, start, end, version, page, _df):
+    """Figura de uma página da tabela, por (recorte, versão, página)"""
+    return create_price_table(_df, page, PAGE_SIZE)
+
+@st.cache_resource
+def start_background_refresh():
+    """Registra as fontes e inicia a atualização em segundo plano (uma vez por processo)"""
+    aquecidas = set()
+
+    def refresh_geodata():
+        if geodata_is_stale():
+            build_geodata()
+        for level in SIMPLIFICATION_LEVELS:
+            static_geometry(level, geodata_version())  # Arquivos do mapa prontos antes do primeiro acesso
+        region_index("alta", geodata_version())  # Índice espacial usado no clique do mapa
+        aquecidas.add(geodata_version())
+
+    refresher.register(
+        "geodata",
+        refresh_geodata,
+        is_due=lambda: geodata_is_stale() or geodata_version() not in aquecidas
+    )
+
+    def refresh_state_metrics():
+        df_periodos = load_state_metrics()  # Junção espacial da nova base pronta antes do primeiro acesso
+        versao = data_version(df_periodos)
+        for variavel in MAP_VARIABLES:
+            period_classes(variavel, versao, df_periodos)  # Cores de todas as safras já classificadas
+        aquecidas.add((points_version(), geodata_version()))
+
+    refresher.register(
+        "pontos",
+        refresh_state_metrics,
+        is_due=lambda: points_version() is not None and (points_version(), geodata_version()) not in aquecidas
+    )
+    for commodity in Config.PREFETCH_COMMODITIES:
+        watch_commodity(commodity)
+    refresher.trigger()
 
-df = load_data()
+seed_sample_prices()
+versao_df = timeseries_store.version()  # Chave das séries derivadas em cache
+df = load_data(versao_df)
 
 # Dados estaduais com formatação profissional
 estados_brasil = {
@@ -204,19 +246,57 @@ estados_brasil = {
     "Lat": [-12.5, -24.5, -30.0, -16.5, -18.5, -22.0, -12.0, -20.5],
     "Lon": [-55.5, -51.5, -53.0, -49.5, -44.5, -47.5, -41.5, -54.5]
 }
-df_mapa = pd.DataFrame(estados_brasil)
-
-def convert_df(df, format_type):
-    """Converte DataFrame para diferentes formatos"""
-    if format_type == "CSV":
-        return df.to_csv(index=True).encode('utf-8')
-    elif format_type == "Excel":
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=True)
-        return output.getvalue()
-    elif format_type == "JSON":
-        return df.to_json(orient='records').encode('utf-8')
+
+# Safras de exemplo: fração da produtividade e da área da última safra (2023/24)
+safras_exemplo = {
+    "2020/21": (0.80, 0.90),
+    "2021/22": (0.90, 0.94),
+    "2022/23": (0.95, 0.97),
+    "2023/24": (1.00, 1.00),
+}
+
+MAP_VARIABLES = ["Produtividade (sc/ha)", "Área Cultivada (mi ha)"]
+
+@shared_dataset
+def sample_state_metrics():
+    """Indicadores de exemplo por safra (um DataFrame por processo, visões por sessão)"""
+    estados = pd.DataFrame(estados_brasil)
+    safras = [
+        estados.assign(**{
+            "Safra": safra,
+            "Produtividade (sc/ha)": (estados["Produtividade (sc/ha)"] * prod).round(1),
+            "Área Cultivada (mi ha)": (estados["Área Cultivada (mi ha)"] * area).round(2),
+        })
+        for safra, (prod, area) in safras_exemplo.items()
+    ]
+    return pd.concat(safras, ignore_index=True)[["Safra", *estados.columns]]
+
+def load_state_metrics():
+    """Indicadores por safra e estado agregados da base de pontos (junção
+    espacial em cache por versão); sem a base, usa a tabela de exemplo"""
+    versao_pontos = points_version()
+    if versao_pontos is None:
+        return sample_state_metrics()
+    return regional_yields(Config.YIELD_POINTS_FILE, versao_pontos, geodata_version())
+
+df_periodos = load_state_metrics()
+
+@shared_dataset(max_entries=32)
+def period_snapshot(version, periodo, _df_periodos):
+    """Indicadores de uma safra, no formato do df_mapa (uma linha por estado)"""
+    return _df_periodos[_df_periodos['Safra'].astype(str) == periodo].reset_index(drop=True)
+
+@shared_dataset(max_entries=8)
+def state_positions(version, _df_mapa):
+    """Sigla -> posição da linha no df_mapa (consulta direta, sem máscara booleana)"""
+    return {sigla: i for i, sigla in enumerate(_df_mapa['Estado'])}
+
+@shared_dataset(max_entries=8)
+def state_histories(version, _df_periodos):
+    """Sigla -> série do estado em todas as safras, ordenada (um groupby por versão)"""
+    ordenado = _df_periodos.sort_values('Safra', kind='stable')
+    return {sigla: grupo.reset_index(drop=True) for sigla, grupo in ordenado.groupby('Estado', sort=False)}
+start_background_refresh()
 
 # --- Header Holográfico ---
 col1, col2 = st.columns([1, 3])
@@ -267,17 +347,53 @@ with col4:
         help="CONAB Safra 2023/24"
     )
 
-# --- Visualizações Premium ---
-tab1, tab2, tab3 = st.tabs(["📈 ANÁLISE MERCADOLÓGICA", "🌎 MAPA DE PRODUTIVIDADE", "📊 DADOS DETALHADOS"])
+# --- Cotações Internacionais (commodities monitoradas) ---
+def render_watched_prices(aguardando):
+    """Último preço de cada commodity de PREFETCH_COMMODITIES: o que já está no
+    histórico aparece na hora, o resto entra conforme chega da API"""
+    carregando = False
+    commodities = Config.PREFETCH_COMMODITIES
+    for col, commodity in zip(st.columns(len(commodities)), commodities):
+        serie = timeseries_store.read(commodity)
+        with col:
+            if serie is not None and len(serie):
+                valores = serie['value']
+                variacao = f"{(valores.iloc[-1] / valores.iloc[-2] - 1) * 100:+.1f}%" if len(valores) > 1 else None
+                st.metric(commodity, f"{valores.iloc[-1]:,.2f}", delta=variacao,
+                          help=f"Alpha Vantage - {serie['date'].iloc[-1]:%m/%Y}")
+                continue
+            # Sem histórico: a carga roda no event loop e o script não espera por ela
+            carga = prefetch_commodity(commodity)
+            if not carga.done():
+                carregando = True
+                st.metric(commodity, "…", help="Carregando da API")
+            else:
+                erro = carga.exception()
+                st.metric(commodity, "—", help=f"Indisponível: {erro}" if erro else "Sem dados na API")
+    if aguardando and not carregando:
+        st.rerun()  # Tudo carregado: um rerun completo encerra a consulta periódica
+
+if Config.PREFETCH_COMMODITIES:
+    st.subheader("🌍 COTAÇÕES INTERNACIONAIS")
+    aguardando = any(
+        not timeseries_store.exists(c) and not prefetch_commodity(c).done()
+        for c in Config.PREFETCH_COMMODITIES
+    )
+    # Só o fragmento é reexecutado enquanto houver carga em andamento
+    st.fragment(render_watched_prices, run_every=2 if aguardando else None)(aguardando)
 
-with tab1:
+# --- Visualizações Premium ---
+# Cada aba é uma função: só a aba ativa é executada a cada rerun
+def render_market_tab():
+    """Aba 1: análise mercadológica das commodities"""
     view_type = st.radio("Tipo de Visualização:",
                     ["Área Empilhada", "Heatmap", "Linhas Paralelas"],
                     horizontal=True)
     if view_type == "Área Empilhada":
         st.subheader("📊 DISTRIBUIÇÃO RELATIVA DAS COMMODITIES")
 
-        fig = px.area(df.reset_index(), 
+        # Séries longas são reduzidas (LTTB) antes de irem para o navegador
+        fig = px.area(downsample(versao_df, df).reset_index(), 
                     x='Data', 
                     y=df.columns,
                     height=500,
@@ -311,8 +427,8 @@ with tab1:
     elif view_type == "Heatmap":
         st.subheader("🔥 HEATMAP DE VARIAÇÃO PERCENTUAL")
         
-        # Calcula variação percentual
-        returns = df.pct_change().dropna() * 100
+        # Variação percentual (pré-calculada por versão dos dados)
+        returns = pct_returns(versao_df, df)
         
         fig = px.imshow(returns.T,
                     x=returns.index,
@@ -349,7 +465,7 @@ with tab1:
         st.subheader("📈 EVOLUÇÃO DE PREÇOS POR COMMODITY")
     
         # Cria subplots com eixos compartilhados
-        fig = px.line(df.reset_index(), 
+        fig = px.line(downsample(versao_df, df).reset_index(), 
                     x='Data', 
                     y=df.columns,
                     facet_col='variable',
@@ -372,7 +488,8 @@ with tab1:
         
         st.plotly_chart(fig, use_container_width=True)
 
-with tab2:
+def render_map_tab():
+    """Aba 2: mapa de produtividade, análise geográfica e exportação"""
     # --- Configuração Inicial ---
     st.subheader("🌎 MAPA DE PRODUTIVIDADE DINÂMICO")
     
@@ -381,7 +498,7 @@ with tab2:
     with col1:
         variavel = st.selectbox(
             "Variável Principal",
-            options=["Produtividade (sc/ha)", "Área Cultivada (mi ha)"],
+            options=MAP_VARIABLES,
             key="map_var"
         )
     with col2:
@@ -391,93 +508,92 @@ with tab2:
             key="map_base"
         )
 
-    # --- Processamento de Dados ---
-    df_mapa['size'] = df_mapa['Área Cultivada (mi ha)'] * 2  # Ajuste visual
-    colormap = LinearColormap(
-        colors=['#ff0000', '#ffff00', '#00ff00'],
-        vmin=df_mapa['Produtividade (sc/ha)'].min(),
-        vmax=df_mapa['Produtividade (sc/ha)'].max()
-    ).to_step(n=10)
-
-    # --- Criação do Mapa Folium ---
-    tile_config = TILE_LAYERS.get(mapa_base, TILE_LAYERS["OpenStreetMap"])
-
-    m = folium.Map(
-        location=[-15, -55],
-        zoom_start=4,
-        tiles=tile_config["tiles"],
-        attr=tile_config["attr"],  # Atribuição correta
-        control_scale=True
+    # Safra exibida: cores já classificadas para todas (ver period_classes),
+    # então percorrer as safras só troca a camada dinâmica
+    versao_mapa = data_version(df_periodos)
+    periodos = sorted(df_periodos['Safra'].astype(str).unique())
+    if st.session_state.get("map_periodo") not in periodos:
+        st.session_state["map_periodo"] = periodos[-1]  # Base nova sem a safra escolhida
+    if len(periodos) > 1:
+        periodo = st.select_slider("Safra", options=periodos, key="map_periodo")
+    else:
+        periodo = periodos[0]
+    versao_safra = f"{versao_mapa}:{periodo}"
+    df_mapa = period_snapshot(versao_mapa, periodo, df_periodos)
+
+    # --- Criação do Mapa Folium (em cache por base cartográfica) ---
+    m = build_base_map(mapa_base)
+
+    # Nível de detalhe conforme o zoom da última interação
+    estado_mapa = st.session_state.get("mapa_produtividade") or {}
+    nivel = level_for_zoom(estado_mapa.get("zoom", 4))
+
+    # Camada dinâmica (valores, cores e marcadores da variável) - enviada à parte
+    # do mapa base; a geometria vem do arquivo estático, baixado uma vez
+    camada_estados = build_state_layer(
+        variavel,
+        versao_mapa,
+        periodo,
+        static_geometry(nivel, geodata_version()),
+        df_periodos
     )
 
-    # Camada de Polígonos Estaduais (GeoJSON)
-    folium.GeoJson(
-        estados_geo,
-        name="Estados",
-        style_function=lambda feature: {
-            'fillColor': colormap(feature['properties']['produtividade']),
-            'color': 'white',
-            'weight': 1,
-            'fillOpacity': 0.7
-        },
-        tooltip=folium.GeoJsonTooltip(
-            fields=['sigla', 'nome', 'produtividade'],
-            aliases=['Estado:', 'Nome:', 'Produtividade:'],
-            localize=True
-        )
-    ).add_to(m)
-
-    # Marcadores Circulares
-    for idx, row in df_mapa.iterrows():
-        folium.CircleMarker(
-            location=[row['Lat'], row['Lon']],
-            radius=row['size'],
-            color=colormap(row['Produtividade (sc/ha)']),
-            fill=True,
-            fill_opacity=0.7,
-            popup=f"""
-            <b>{row['Estado']}</b><br>
-            Produtividade: {row['Produtividade (sc/ha)']} sc/ha<br>
-            Área: {row['Área Cultivada (mi ha)']} mi ha
-            """,
-            tooltip=row['Estado']
-        ).add_to(m)
-
-    # --- Controles do Mapa ---
-    colormap.caption = 'Produtividade (sc/ha)'
-    colormap.add_to(m)
-    folium.LayerControl().add_to(m)
-
     # --- Exibição ---
     with st.expander("🔍 Controles Avançados", expanded=True):
-        st_folium(m, width=1170, height=500)
+        retorno_mapa = render_map(
+            m,
+            camada_estados,
+            key="mapa_produtividade",
+            returned_objects=["zoom", "last_clicked"],
+            width=1170,
+            height=500
+        )
+
+    # --- Seleção por clique: estado sob o ponto via índice espacial (STRtree) ---
+    posicoes = state_positions(versao_safra, df_mapa)
+    clique = (retorno_mapa or {}).get("last_clicked")
+    if clique and clique != st.session_state.get("ultimo_clique"):
+        st.session_state["ultimo_clique"] = clique
+        sigla = region_at(clique["lng"], clique["lat"])
+        if sigla in posicoes:
+            st.session_state["estado_selecionado"] = sigla
+        elif sigla:
+            st.toast(f"{sigla}: sem dados de produtividade")
 
     # --- Sidebar Analytics ---
     with st.sidebar:
         st.subheader("📊 Análise Geográfica")
         selected_state = st.selectbox(
-            "Filtrar por Estado",
-            options=df_mapa['Estado'].unique()
+            "Filtrar por Estado (ou clique no mapa)",
+            options=list(posicoes),
+            key="estado_selecionado"
         )
-        state_data = df_mapa[df_mapa['Estado'] == selected_state].iloc[0]
-        
-        st.metric("Produtividade", f"{state_data['Produtividade (sc/ha)']} sc/ha")
-        st.metric("Área Cultivada", f"{state_data['Área Cultivada (mi ha)']} mi ha")
+        state_data = df_mapa.iloc[posicoes[selected_state]]
+
+        # Série do estado em todas as safras (variação contra a safra anterior)
+        historico = state_histories(versao_mapa, df_periodos)[selected_state]
+        anteriores = historico[historico['Safra'].astype(str) < periodo]
+        anterior = anteriores.iloc[-1] if len(anteriores) else None
+
+        def variacao(coluna, unidade):
+            if anterior is None:
+                return None
+            return f"{state_data[coluna] - anterior[coluna]:+.2f} {unidade} vs {anterior['Safra']}"
+
+        st.metric("Produtividade", f"{state_data['Produtividade (sc/ha)']} sc/ha",
+                  delta=variacao('Produtividade (sc/ha)', "sc/ha"))
+        st.metric("Área Cultivada", f"{state_data['Área Cultivada (mi ha)']} mi ha",
+                  delta=variacao('Área Cultivada (mi ha)', "mi ha"))
         
         # Mini-gráfico de tendência
         st.vega_lite_chart({
             "mark": {"type": "area", "interpolate": "monotone"},
             "encoding": {
-                "x": {"field": "Ano", "type": "ordinal"},
-                "y": {"field": "Produtividade", "type": "quantitative"}
+                "x": {"field": "Safra", "type": "ordinal"},
+                "y": {"field": "Produtividade (sc/ha)", "type": "quantitative"}
             },
             "data": {
-                "values": [
-                    {"Ano": "2020", "Produtividade": state_data['Produtividade (sc/ha)'] * 0.8},
-                    {"Ano": "2021", "Produtividade": state_data['Produtividade (sc/ha)'] * 0.9},
-                    {"Ano": "2022", "Produtividade": state_data['Produtividade (sc/ha)'] * 0.95},
-                    {"Ano": "2023", "Produtividade": state_data['Produtividade (sc/ha)']}
-                ]
+                "values": historico[['Safra', 'Produtividade (sc/ha)']].to_dict('records')
             }, "height": 150
         })
 
@@ -503,43 +619,49 @@ with tab2:
         })
 
     with col2:
-        st.plotly_chart(px.scatter(
+        fig = px.scatter(
             df_mapa,
             x="Área Cultivada (mi ha)",
             y="Produtividade (sc/ha)",
             size="Área Cultivada (mi ha)",
             color="Estado",
             hover_name="Estado",
-            trendline="lowess",
             template="plotly_dark",
             height=430
-        ), use_container_width=True)
+        )
+        # Tendência LOWESS sobre todos os estados, calculada uma vez por versão dos dados
+        tendencia = lowess_fit(versao_safra, "Área Cultivada (mi ha)", "Produtividade (sc/ha)", df_mapa)
+        fig.add_scatter(
+            x=tendencia["Área Cultivada (mi ha)"],
+            y=tendencia["Produtividade (sc/ha)"],
+            mode='lines',
+            line=dict(color='white', width=1),
+            name='Tendência (LOWESS)',
+            hoverinfo='skip'
+        )
+        st.plotly_chart(fig, use_container_width=True)
 
     # --- Exportação de Dados ---
     st.divider()
 
     with st.expander("💾 Exportar Dados Geoespaciais", expanded=False):
-        export_formats = {
-            "GeoJSON": ("geojson", "application/geo+json"),
-            "Shapefile": ("zip", "application/zip"),
-            "CSV": ("csv", "text/csv")
-        }
+        export_formats = {**GEO_FORMATS, "CSV": DATAFRAME_FORMATS["CSV"]}
+        versao_pontos = points_version()
+        if versao_pontos is not None:
+            df_municipios = municipal_yields(Config.YIELD_POINTS_FILE, versao_pontos)
+            if len(df_municipios):
+                export_formats["CSV (municípios)"] = DATAFRAME_FORMATS["CSV"]
         
         format_type = st.radio("Formato", list(export_formats.keys()), horizontal=True)
         
-        if format_type == "GeoJSON":
-            data = json.dumps(estados_geo)
-        elif format_type == "Shapefile":
-            # Conversão para Shapefile (requer geopandas)
-            gdf = gpd.GeoDataFrame.from_features(estados_geo['features'])
-            with BytesIO() as buffer:
-                with zipfile.ZipFile(buffer, 'w') as zipf:
-                    for ext in ['shp', 'prj', 'dbf', 'shx']:
-                        gdf.to_file(f"dados.{ext}", driver='ESRI Shapefile')
-                        zipf.write(f"dados.{ext}")
-                data = buffer.getvalue()
+        # Arquivo gerado só no clique; GeoJSON/Shapefile com a geometria de maior detalhe
+        if format_type == "CSV":
+            # Todas as safras, uma linha por (safra, estado)
+            data = dataframe_export(df_periodos, "CSV", ("mapa", versao_mapa), index=False)
+        elif format_type == "CSV (municípios)":
+            data = dataframe_export(df_municipios, "CSV", ("municipios", versao_pontos), index=False)
         else:
-            data = df_mapa.to_csv(index=False).encode('utf-8')
+            data = geodata_export(load_geodata("alta"), format_type, ("estados", "alta", geodata_version()))
         
         st.download_button(
             label=f"⬇️ Exportar como {format_type}",
@@ -548,7 +670,8 @@ with tab2:
             mime=export_formats[format_type][1]
         )
 
-with tab3:
+def render_details_tab():
+    """Aba 3: filtros, tabela/gráficos detalhados e exportação"""
     st.subheader("🔍 DASHBOARD ANALÍTICO AVANÇADO")
     
     # --- Filtros Interativos ---
@@ -576,39 +699,35 @@ with tab3:
             key="metric_view"
         )
     
+    if not commodity_filter:
+        st.info("Selecione ao menos uma commodity.")
+        return
+
     # Filtra os dados
-    filtered_df = df[commodity_filter].loc[date_range[0]:date_range[1]]
+    filtered_df = query_prices(tuple(commodity_filter), date_range[0], date_range[1], versao_df)
     
     # --- Visualizações Condicionais ---
     if metric_view == "Tabela Dinâmica":
         st.markdown("### 📊 TABELA INTERATIVA")
         
-        # Tabela estilizada com Plotly
-        fig = go.Figure(data=[go.Table(
-            header=dict(
-                values=['<b>Data</b>'] + [f'<b>{col}</b>' for col in filtered_df.columns],
-                fill_color='#1a2a6c',
-                align=['left'] + ['center']*len(filtered_df.columns),
-                font=dict(color='white', size=14),
-                height=40
-            ),
-            cells=dict(
-                values=[filtered_df.index.strftime('%d/%m/%Y')] + [filtered_df[col].round(2) for col in filtered_df.columns],
-                fill_color='rgba(26, 42, 108, 0.3)',
-                align=['left'] + ['center']*len(filtered_df.columns),
-                font=dict(color='white', size=12),
-                height=35,
-                format=[None] + [',.2f']*len(filtered_df.columns)
-            )
-        )])
-        
-        fig.update_layout(
-            margin=dict(l=0, r=0, t=0, b=0),
-            height=min(600, 35 * (len(filtered_df) + 1)),
-            paper_bgcolor='rgba(0,0,0,0)'
+        # Paginação no servidor: só as linhas da página vão para o navegador
+        paginas = page_count(len(filtered_df))
+        if st.session_state.get("tabela_pagina", 1) > paginas:
+            st.session_state["tabela_pagina"] = paginas  # Recorte ficou menor que a página atual
+        pagina = st.number_input(
+            f"Página (de {paginas})",
+            min_value=1,
+            max_value=paginas,
+            step=1,
+            key="tabela_pagina"
         )
         
+        fig = price_table_page(tuple(commodity_filter), date_range[0], date_range[1],
+                               versao_df, pagina - 1, filtered_df)
         st.plotly_chart(fig, use_container_width=True)
+        inicio = (pagina - 1) * PAGE_SIZE
+        st.caption(f"Linhas {min(inicio + 1, len(filtered_df))}–{min(inicio + PAGE_SIZE, len(filtered_df))} "
+                   f"de {len(filtered_df)}")
         
         # Funções de análise rápida
         with st.expander("🔍 ANÁLISE RÁPIDA", expanded=False):
@@ -632,8 +751,12 @@ with tab3:
     elif metric_view == "Gráfico Temporal":
         st.markdown("### 📈 ANÁLISE TEMPORAL")
         
+        # Resolução recalculada para o período escolhido: quanto menor o
+        # intervalo, mais detalhe cabe no mesmo número de pontos
+        amostra = downsample(f"{versao_df}:{tuple(commodity_filter)}:{date_range[0]}:{date_range[-1]}", filtered_df)
+        
         fig = px.line(
-            filtered_df.reset_index().melt(id_vars='Data'),
+            amostra.reset_index().melt(id_vars='Data'),
             x='Data',
             y='value',
             color='variable',
@@ -651,11 +774,12 @@ with tab3:
             xaxis=dict(rangeslider=dict(visible=True))
         )
         
-        # Adiciona médias móveis
+        # Adiciona médias móveis (calculadas sobre o histórico completo e recortadas no período)
+        medias = rolling_means(versao_df, df)[3].loc[amostra.index]
         for col in commodity_filter:
             fig.add_scatter(
-                x=filtered_df.index,
-                y=filtered_df[col].rolling(3).mean(),
+                x=amostra.index,
+                y=medias[col],
                 mode='lines',
                 line=dict(dash='dot', width=1),
                 name=f'Média {col}',
@@ -684,15 +808,27 @@ with tab3:
             st.plotly_chart(fig, use_container_width=True)
             
         with col2:
+            eixo_x = commodity_filter[0]
+            eixo_y = commodity_filter[1] if len(commodity_filter) > 1 else commodity_filter[0]
             fig = px.scatter(
                 filtered_df.reset_index(),
-                x=commodity_filter[0],
-                y=commodity_filter[1] if len(commodity_filter) > 1 else commodity_filter[0],
-                trendline="ols",
+                x=eixo_x,
+                y=eixo_y,
                 template='plotly_dark',
                 title='Relação entre Commodities',
                 color_discrete_sequence=['#3a7bd5']
             )
+            # Reta OLS em cache por (dados, período); numpy no lugar do statsmodels
+            reta = linear_fit(f"{versao_df}:{date_range[0]}:{date_range[-1]}", eixo_x, eixo_y, filtered_df)
+            fig.add_scatter(
+                x=reta["x"],
+                y=reta["y"],
+                mode='lines',
+                line=dict(color='#00d2ff'),
+                name=f"OLS (R² = {reta['r2']:.3f})",
+                showlegend=False,
+                hovertemplate=f"y = {reta['slope']:.4f}x + {reta['intercept']:.2f}<br>R² = {reta['r2']:.3f}<extra></extra>"
+            )
             st.plotly_chart(fig, use_container_width=True)
     
     # --- Módulo de Exportação ---
@@ -702,20 +838,46 @@ with tab3:
         with export_col1:
             export_format = st.radio(
                 "Formato de Exportação",
-                options=["CSV", "Excel", "JSON"],
+                options=list(DATAFRAME_FORMATS.keys()),
                 horizontal=True,
                 key="export_format"
             )
             
         with export_col2:
+            # Gerado sob demanda e reaproveitado enquanto os filtros não mudarem
+            filtros = (tuple(commodity_filter), str(date_range[0]), str(date_range[-1]), versao_df)
+            extensao, mime = DATAFRAME_FORMATS[export_format]
             st.download_button(
                 label=f"⬇️ Exportar ({export_format})",
-                data=convert_df(filtered_df, export_format),
-                file_name=f"agro_data_{datetime.now().strftime('%Y%m%d')}.{export_format.lower()}",
-                mime=f"text/{export_format.lower()}" if export_format != "Excel" else "application/vnd.ms-excel",
+                data=dataframe_export(filtered_df, export_format, filtros),
+                file_name=f"agro_data_{datetime.now().strftime('%Y%m%d')}.{extensao}",
+                mime=mime,
                 key="download_button"
             )
 
+# on_change="rerun" faz as abas rastrearem a seleção (`.open`), então
+# widgets de uma aba não pagam pelo mapa/gráficos das demais
+tab1, tab2, tab3 = st.tabs(
+    ["📈 ANÁLISE MERCADOLÓGICA", "🌎 MAPA DE PRODUTIVIDADE", "📊 DADOS DETALHADOS"],
+    key="aba_ativa",
+    on_change="rerun"
+)
+
+with tab1:
+    if tab1.open:
+        with stage("aba:mercado"):
+            render_market_tab()
+
+with tab2:
+    if tab2.open:
+        with stage("aba:mapa"):
+            render_map_tab()
+
+with tab3:
+    if tab3.open:
+        with stage("aba:detalhes"):
+            render_details_tab()
+
 # --- Rodapé Tecnológico ---
 st.markdown("---")
 st.markdown("""
@@ -727,3 +889,5 @@ st.markdown("""
     </p>
 </div>
 """, unsafe_allow_html=True)
+
+render_debug_panel()
@@ -0,0 +1,8 @@
+# benchmarks
+"""Medições de desempenho (não são testes).
+
+- `python -m benchmarks`: suíte dos caminhos de dados e renderização (ver runner.py)
+- `python -m benchmarks.import_time`: tempo de importação no start
+- `python -m benchmarks.memory_sessions`: memória por sessão
+- `python -m benchmarks.parse_memory`: pico de memória do parse das respostas da API
+"""
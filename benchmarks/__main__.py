@@ -0,0 +1,5 @@
+# benchmarks/__main__.py
+"""python -m benchmarks [-k filtro] [--max-rows N] [-o resultados.json] [--compare base.json]"""
+from benchmarks.runner import main
+
+main()
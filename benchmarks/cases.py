@@ -0,0 +1,282 @@
+# benchmarks/cases.py
+"""Benchmarks dos caminhos quentes, chamando o código real do app.
+
+Tamanhos: séries de 12 a 10M linhas (até 200k nos casos com datas diárias:
+API simulada, armazenamento e reruns do app) e de 8 a 5.570 regiões (municípios).
+"""
+import json
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import requests
+
+import api_connector
+from analytics import data_version
+from exports import DATAFRAME_FORMATS, convert_df
+from geodata import SIMPLIFICATION_LEVELS, build_geodata, load_state_geojson, publish_geodata
+from maps import build_base_map, build_state_layer, period_classes
+from storage import timeseries_store
+
+from benchmarks import fixtures, stub_api
+from benchmarks.runner import ROOT, SkipBenchmark, benchmark
+
+ROWS = (12, 1_000, 100_000, 1_000_000, 10_000_000)
+REGIONS = (8, 27, 500, 5_570)
+
+# Limite de linhas de uma planilha (.xlsx), descontado o cabeçalho
+EXCEL_MAX_ROWS = 1_048_575
+
+TAB1_VIEWS = ("Área Empilhada", "Heatmap", "Linhas Paralelas")
+TAB3_VIEWS = ("Tabela Dinâmica", "Gráfico Temporal", "Análise Comparativa")
+
+_WORKDIR = tempfile.TemporaryDirectory(prefix="agrotech-bench-")
+
+
+def _workdir(*partes) -> Path:
+    path = Path(_WORKDIR.name, *map(str, partes))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@lru_cache(maxsize=None)
+def _geodata_dir(regions: int) -> str:
+    shp = fixtures.write_grid_shapefile(regions, str(_workdir("shp", regions) / "grade.shp"))
+    saida = str(_workdir("geo", regions))
+    build_geodata(shp, saida)
+    return saida
+
+
+@lru_cache(maxsize=None)
+def _store_dir(rows: int) -> Path:
+    root = _workdir("store", rows)
+    original = timeseries_store.root
+    timeseries_store.root = root
+    try:
+        fixtures.fill_store(timeseries_store, rows)
+    finally:
+        timeseries_store.root = original
+    return root
+
+
+# --- Geodados ---
+
+@benchmark(regions=REGIONS)
+def geodata_build(regions):
+    """Shapefile -> GeoJSON simplificados (make_valid, simplificação, bbox)."""
+    _geodata_dir(regions)  # Gera o shapefile
+    shp = str(_workdir("shp", regions) / "grade.shp")
+    saida = str(_workdir("geo-build", regions))
+    return lambda: build_geodata(shp, saida)
+
+
+@benchmark(regions=REGIONS, level=tuple(SIMPLIFICATION_LEVELS))
+def geodata_load(regions, level):
+    """Leitura do índice pré-processado (corpo do `load_geodata`)."""
+    saida = _geodata_dir(regions)
+    return lambda: load_state_geojson(level, saida)
+
+
+# --- Mapa (aba 2) ---
+
+@benchmark(regions=REGIONS)
+def map_tab(regions):
+    """Mapa base + camada dinâmica + HTML final (o que o st_folium envia)."""
+    df_periodos = fixtures.period_metrics(regions, 1)
+    geometria = publish_geodata("media", _geodata_dir(regions), _workdir("static", regions))
+    versao = data_version(df_periodos)
+    safra = df_periodos["Safra"].iloc[0]
+
+    def run():
+        build_base_map.clear()
+        period_classes.clear()
+        build_state_layer.clear()
+        m = build_base_map("OpenStreetMap")
+        build_state_layer("Produtividade (sc/ha)", versao, safra, geometria, df_periodos).add_to(m)
+        return m.get_root().render()
+    return run
+
+
+@benchmark(regions=REGIONS)
+def map_switch_variable(regions):
+    """Troca da variável do mapa: só a camada dinâmica é refeita e reenviada."""
+    from streamlit_folium import _get_feature_group_string
+
+    df_periodos = fixtures.period_metrics(regions, 1)
+    geometria = publish_geodata("media", _geodata_dir(regions), _workdir("static", regions))
+    versao = data_version(df_periodos)
+    safra = df_periodos["Safra"].iloc[0]
+    m = build_base_map("OpenStreetMap")
+
+    def run():
+        period_classes.clear()
+        build_state_layer.clear()
+        camada = build_state_layer("Área Cultivada (mi ha)", versao, safra, geometria, df_periodos)
+        try:
+            return _get_feature_group_string(camada, m)
+        finally:
+            m._children.pop(camada.get_name(), None)
+    return run
+
+
+@benchmark(regions=REGIONS, periods=(4, 20))
+def map_scrub_periods(regions, periods):
+    """Percorre todas as safras (slider): a escala e as cores já estão
+    classificadas, cada passo só monta e serializa a camada da safra."""
+    from streamlit_folium import _get_feature_group_string
+
+    df_periodos = fixtures.period_metrics(regions, periods)
+    geometria = publish_geodata("media", _geodata_dir(regions), _workdir("static", regions))
+    versao = data_version(df_periodos)
+    safras = sorted(df_periodos["Safra"].unique())
+    m = build_base_map("OpenStreetMap")
+    period_classes("Produtividade (sc/ha)", versao, df_periodos)
+
+    def run():
+        build_state_layer.clear()
+        for safra in safras:
+            camada = build_state_layer("Produtividade (sc/ha)", versao, safra, geometria, df_periodos)
+            try:
+                _get_feature_group_string(camada, m)
+            finally:
+                m._children.pop(camada.get_name(), None)
+    return run
+
+
+# --- Exportações ---
+
+@benchmark(rows=ROWS, format_type=tuple(DATAFRAME_FORMATS))
+def export(rows, format_type):
+    if format_type == "Excel" and rows > EXCEL_MAX_ROWS:
+        raise SkipBenchmark("acima do limite de linhas do Excel")
+    df = fixtures.price_frame(rows)
+    return lambda: convert_df(df, format_type)
+
+
+# --- API ---
+
+class _StubSession(requests.Session):
+    """Redireciona as chamadas da Alpha Vantage para o servidor local."""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+
+    def get(self, url, **kwargs):
+        return super().get(url.replace("https://www.alphavantage.co", self.base_url), **kwargs)
+
+
+def _daily_rows(rows: int) -> None:
+    # Datas diárias: mais linhas que isso não existem no armazenamento nem na API simulada
+    if rows > fixtures.STORE_MAX_ROWS:
+        raise SkipBenchmark(f"datas diárias: até {fixtures.STORE_MAX_ROWS} linhas")
+
+
+@lru_cache(maxsize=None)
+def _stub_url() -> str:
+    servidor = stub_api.start()
+    return f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+@benchmark(rows=ROWS)
+def fetch_commodity(rows):
+    """Primeira carga de uma commodity: download, parse e gravação no histórico."""
+    _daily_rows(rows)
+    sessao = _StubSession(_stub_url())
+    # Sem cota: o benchmark mede o cliente, não o token bucket
+    agendador = api_connector.RequestScheduler(per_minute=10**9, per_day=10**9)
+    commodity = stub_api.commodity_name(rows)
+    root = _workdir("fetch", rows)
+
+    def run():
+        # Substituições só durante a medição: os casos seguintes usam os originais
+        originais = api_connector._session, api_connector.scheduler, timeseries_store.root
+        api_connector._session, api_connector.scheduler, timeseries_store.root = sessao, agendador, root
+        try:
+            shutil.rmtree(root, ignore_errors=True)
+            api_connector._fetch_commodity_data.clear()
+            return api_connector.fetch_commodity_data(commodity)
+        finally:
+            api_connector._session, api_connector.scheduler, timeseries_store.root = originais
+    return run
+
+
+@benchmark(rows=ROWS, parser=("json", "stream"))
+def parse_response(rows, parser):
+    """Parse da resposta já recebida: response.json() + DataFrame x jsonstream."""
+    _daily_rows(rows)
+    corpo = stub_api._body(rows)
+    if parser == "json":
+        return lambda: api_connector.parse_commodity_response(json.loads(corpo))
+    blocos = [corpo[i:i + api_connector.CHUNK_SIZE] for i in range(0, len(corpo), api_connector.CHUNK_SIZE)]
+    return lambda: api_connector.parse_commodity_stream(blocos)
+
+
+@benchmark(rows=ROWS, series=(1, 8))
+def ingest_backfill(rows, series):
+    """Backfill pelo pool de processos do `ingest.py` (inclui subir o pool)."""
+    from ingest import ingest
+
+    _daily_rows(rows)
+    commodities = [stub_api.commodity_name(rows, i) for i in range(series)]
+    root = _workdir("ingest", rows, series)
+
+    def run():
+        shutil.rmtree(root, ignore_errors=True)
+        return ingest(commodities, root, base_url=_stub_url(), rate_limit=False)
+    return run
+
+
+# --- Reruns do app (abas 1 e 3) ---
+
+def _app(rows: int, aba: str):
+    from streamlit.testing.v1 import AppTest
+
+    _daily_rows(rows)
+    os.chdir(ROOT)  # logo.svg e dados.shp são relativos ao diretório do app
+    timeseries_store.root = _store_dir(rows)
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=600)
+    at.session_state["aba_ativa"] = aba
+    return at
+
+
+def _rerun(at):
+    def run():
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    return run
+
+
+@benchmark(rows=ROWS, view=TAB1_VIEWS)
+def market_tab_rerun(rows, view):
+    at = _app(rows, "📈 ANÁLISE MERCADOLÓGICA")
+    at.run()
+    next(r for r in at.radio if r.label == "Tipo de Visualização:").set_value(view)
+    return _rerun(at)
+
+
+@benchmark(rows=ROWS, view=TAB3_VIEWS)
+def details_tab_rerun(rows, view):
+    at = _app(rows, "📊 DADOS DETALHADOS")
+    at.run()
+    at.radio(key="metric_view").set_value(view)
+    return _rerun(at)
+
+
+# --- Junção espacial ---
+
+@benchmark(rows=ROWS, regions=REGIONS)
+def spatial_join(rows, regions):
+    """Pontos de produtividade -> regiões (STRtree) + agregação por região."""
+    from spatial import RegionIndex, aggregate_points
+
+    if regions == 27:
+        geo = load_state_geojson("alta")  # Estados reais
+    else:
+        geo = fixtures.grid_geojson(regions)
+    indice = RegionIndex(geo)
+    pontos = fixtures.yield_points(rows)
+    return lambda: aggregate_points(indice, pontos)
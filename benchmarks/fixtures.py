@@ -0,0 +1,129 @@
+# benchmarks/fixtures.py
+"""Dados sintéticos nos mesmos formatos usados pelo app, em qualquer tamanho."""
+import math
+
+import numpy as np
+import pandas as pd
+
+COMMODITIES = ["Soja", "Milho", "Café"]
+
+# Extensão aproximada do Brasil (graus)
+LAT_RANGE = (-33.0, 5.0)
+LON_RANGE = (-74.0, -34.0)
+
+
+# O armazenamento guarda datas (date32): no máximo um ponto por dia. Começando
+# em 1700, cabem STORE_MAX_ROWS dias antes do limite do datetime64[ns] (2262)
+STORE_START = "1700-01-01"
+STORE_MAX_ROWS = 200_000
+
+
+def price_frame(rows: int, commodities=COMMODITIES, freq: str = "min",
+                start: str = "2010-01-01") -> pd.DataFrame:
+    """Séries de preço no formato de `load_data` (índice `Data`), por minuto por padrão."""
+    rng = np.random.default_rng(0)
+    datas = pd.date_range(start, periods=rows, freq=freq)
+    valores = rng.normal(0, 1, (rows, len(commodities))).cumsum(axis=0) + 100
+    return pd.DataFrame(valores, index=pd.Index(datas, name="Data"), columns=commodities)
+
+
+def fill_store(store, rows: int, commodities=COMMODITIES) -> None:
+    """Grava `rows` pontos diários por commodity no TimeSeriesStore."""
+    if rows > STORE_MAX_ROWS:
+        raise ValueError(f"O armazenamento guarda um ponto por dia: no máximo {STORE_MAX_ROWS} linhas")
+    precos = price_frame(rows, commodities, freq="D", start=STORE_START)
+    for commodity in commodities:
+        store.append(commodity, pd.DataFrame({"date": precos.index, "value": precos[commodity].to_numpy()}))
+
+
+def region_codes(regions: int) -> list:
+    return [f"R{i:04d}" for i in range(regions)]
+
+
+def state_metrics(regions: int) -> pd.DataFrame:
+    """Indicadores por região no formato de `df_mapa`."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "Estado": region_codes(regions),
+        "Produtividade (sc/ha)": rng.uniform(45, 65, regions).round(1),
+        "Área Cultivada (mi ha)": rng.uniform(0.1, 12, regions).round(1),
+        "Escoamento": rng.choice(["Ferrovia", "Porto", "Rodovia"], regions),
+        "Lat": rng.uniform(*LAT_RANGE, regions),
+        "Lon": rng.uniform(*LON_RANGE, regions),
+    })
+
+
+def period_metrics(regions: int, periods: int) -> pd.DataFrame:
+    """Indicadores por (safra, região) no formato de `load_state_metrics`."""
+    base = state_metrics(regions)
+    rng = np.random.default_rng(1)
+    safras = []
+    for i in range(periods):
+        safra = f"{2000 + i}/{(1 + i) % 100:02d}"
+        fator = rng.uniform(0.8, 1.2, regions)
+        safras.append(base.assign(**{
+            "Safra": safra,
+            "Produtividade (sc/ha)": (base["Produtividade (sc/ha)"] * fator).round(1),
+        }))
+    return pd.concat(safras, ignore_index=True)
+
+
+def _grid(regions: int):
+    """Células de uma grade regular sobre o Brasil: (sigla, oeste, sul, leste, norte)."""
+    colunas = math.ceil(math.sqrt(regions))
+    linhas = math.ceil(regions / colunas)
+    dx = (LON_RANGE[1] - LON_RANGE[0]) / colunas
+    dy = (LAT_RANGE[1] - LAT_RANGE[0]) / linhas
+    for i, sigla in enumerate(region_codes(regions)):
+        oeste = LON_RANGE[0] + (i % colunas) * dx
+        sul = LAT_RANGE[0] + (i // colunas) * dy
+        yield sigla, oeste, sul, oeste + dx, sul + dy
+
+
+def grid_geojson(regions: int) -> dict:
+    """FeatureCollection no formato gerado por `build_geodata` (com bbox)."""
+    rng = np.random.default_rng(0)
+    features = []
+    for (sigla, oeste, sul, leste, norte), prod in zip(_grid(regions), rng.uniform(45, 65, regions)):
+        features.append({
+            "type": "Feature",
+            "bbox": [oeste, sul, leste, norte],
+            "properties": {"sigla": sigla, "nome": sigla, "regiao_id": 0,
+                           "codigo_ibg": 0, "produtividade": round(float(prod), 1)},
+            "geometry": {"type": "Polygon", "coordinates": [[
+                [oeste, sul], [leste, sul], [leste, norte], [oeste, norte], [oeste, sul]
+            ]]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def write_grid_shapefile(regions: int, path: str) -> str:
+    """Shapefile com as colunas do `dados.shp` original, para `build_geodata`."""
+    import geopandas as gpd
+    from shapely.geometry import box
+
+    celulas = list(_grid(regions))
+    gdf = gpd.GeoDataFrame(
+        {
+            "name": [c[0] for c in celulas],
+            "nome": [c[0] for c in celulas],
+            "sigla": [c[0] for c in celulas],
+            "regiao_id": 0,
+            "codigo_ibg": 0,
+        },
+        geometry=[box(*c[1:]) for c in celulas],
+        crs="EPSG:4326",
+    )
+    gdf.to_file(path, driver="ESRI Shapefile")
+    return path
+
+
+def yield_points(rows: int) -> pd.DataFrame:
+    """Pontos de produtividade (lon, lat, produtividade, area_ha) espalhados pelo país."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "lon": rng.uniform(*LON_RANGE, rows),
+        "lat": rng.uniform(*LAT_RANGE, rows),
+        "produtividade": rng.uniform(40, 70, rows),
+        "area_ha": rng.uniform(10, 2_000, rows),
+    })
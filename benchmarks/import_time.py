@@ -0,0 +1,121 @@
+# benchmarks/import_time.py
+"""Tempo de importação a frio dos módulos carregados no start do app.
+
+Roda `python -X importtime` num processo novo, soma o tempo cumulativo dos
+imports de primeiro nível e falha (código de saída 1) se o total passar do
+orçamento ou se alguma dependência pesada for carregada no start; ela deve
+ser importada só no caminho que a usa (aba do mapa, exportações, LOWESS).
+
+Uso:
+    python -m benchmarks.import_time --budget 2.5
+    python -m benchmarks.import_time --check  # só as dependências pesadas (CI)
+"""
+import argparse
+import ast
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def startup_modules(script: Path = ROOT / "app.py") -> list:
+    """Imports de primeiro nível do app.py e, recursivamente, dos módulos do
+    projeto que ele importa (imports dentro de funções ficam de fora).
+
+    Lidos do código a cada execução: um módulo novo no start entra sozinho
+    na conta do orçamento.
+    """
+    modulos, pendentes, vistos = [], [script], set()
+    while pendentes:
+        arvore = ast.parse(pendentes.pop(0).read_text(encoding="utf-8"))
+        for no in arvore.body:
+            if isinstance(no, ast.Import):
+                nomes = [alias.name for alias in no.names]
+            elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+                nomes = [no.module]
+            else:
+                continue
+            for nome in nomes:
+                if nome in vistos:
+                    continue
+                vistos.add(nome)
+                modulos.append(nome)
+                local = ROOT / f"{nome.replace('.', '/')}.py"
+                if local.exists():
+                    pendentes.append(local)
+    return modulos
+
+
+STARTUP_MODULES = startup_modules()
+
+# Não podem aparecer no start
+LAZY_MODULES = [
+    "geopandas", "shapely", "pyproj", "fiona", "pyogrio", "statsmodels",
+    "xlsxwriter", "folium", "branca", "streamlit_folium",
+]
+
+_LINHA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(modules=STARTUP_MODULES) -> list:
+    """Executa os imports num interpretador novo.
+
+    Returns:
+        list: (módulo, nível de aninhamento, cumulativo em segundos)
+    """
+    codigo = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    entradas = []
+    for linha in proc.stderr.splitlines():
+        casamento = _LINHA.match(linha)
+        if casamento:
+            _, cumulativo, recuo, nome = casamento.groups()
+            entradas.append((nome, len(recuo) // 2, int(cumulativo) / 1e6))
+    return entradas
+
+
+def lazy_loaded(entradas) -> list:
+    """Entradas de `LAZY_MODULES` carregadas (o pacote ou algum submódulo)."""
+    carregados = {nome.split(".")[0] for nome, _, _ in entradas}
+    return [m for m in LAZY_MODULES if m in carregados]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=2.5, help="Orçamento total (s)")
+    parser.add_argument("--top", type=int, default=10, help="Imports mais caros exibidos")
+    parser.add_argument("--check", action="store_true",
+                        help="Só falha se alguma dependência pesada for carregada no start (sem orçamento de tempo)")
+    args = parser.parse_args()
+
+    entradas = measure()
+    pesados = lazy_loaded(entradas)
+    if args.check:
+        if pesados:
+            print(f"FALHA: dependências pesadas carregadas no start: {', '.join(pesados)}", file=sys.stderr)
+        sys.exit(1 if pesados else 0)
+
+    raiz = [(nome, t) for nome, nivel, t in entradas if nivel == 0]
+    total = sum(t for _, t in raiz)
+
+    for nome, t in sorted(raiz, key=lambda e: e[1], reverse=True)[:args.top]:
+        print(f"{t:7.3f}s  {nome}")
+    print(f"total: {total:.3f}s (orçamento {args.budget:.3f}s)")
+
+    falhas = []
+    if total > args.budget:
+        falhas.append(f"tempo de importação acima do orçamento: {total:.3f}s > {args.budget:.3f}s")
+    if pesados:
+        falhas.append(f"dependências pesadas carregadas no start: {', '.join(pesados)}")
+    for falha in falhas:
+        print(f"FALHA: {falha}", file=sys.stderr)
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/memory_sessions.py
+"""Memória por sessão: cópia por sessão (st.cache_data) x plano compartilhado.
+
+Simula N sessões que carregam o histórico de preços e montam seu recorte
+(commodities + período), mantendo tudo vivo como o Streamlit faz entre
+reruns, e mede com tracemalloc quanto cada sessão adiciona.
+
+Uso:
+    python -m benchmarks.memory_sessions --rows 500000 --sessions 20
+"""
+import argparse
+import gc
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dataplane import shared_dataset
+
+COMMODITIES = ["Soja", "Milho", "Café", "Trigo", "Algodão"]
+
+
+def synthetic_prices(rows: int) -> pd.DataFrame:
+    datas = pd.date_range("2000-01-01", periods=rows, freq="min")
+    rng = np.random.default_rng(0)
+    valores = rng.normal(0, 1, (rows, len(COMMODITIES))).cumsum(axis=0) + 100
+    return pd.DataFrame(valores, index=pd.Index(datas, name="Data"), columns=COMMODITIES)
+
+
+def per_session_bytes(load, sessions: int) -> float:
+    """Bytes alocados por sessão (média), mantendo o recorte de cada uma vivo."""
+    load("v1")  # Primeira carga (custo por processo, fora da medição)
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    vivas = []
+    for _ in range(sessions):
+        df = load("v1")
+        inicio, fim = df.index[len(df) // 4], df.index[-1]
+        vivas.append((df, df.loc[inicio:fim, ["Soja", "Milho"]]))
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (atual - base) / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+
+    dados = synthetic_prices(args.rows)
+    tamanho = dados.memory_usage(deep=True).sum()
+
+    pd.set_option("mode.copy_on_write", False)
+    antes = per_session_bytes(st.cache_data(lambda version: dados.copy()), args.sessions)
+
+    pd.set_option("mode.copy_on_write", True)
+    depois = per_session_bytes(shared_dataset(lambda version: dados.copy()), args.sessions)
+
+    mib = 1024 ** 2
+    print(f"dataset: {args.rows} linhas, {tamanho / mib:.1f} MiB; {args.sessions} sessões")
+    print(f"antes  (st.cache_data + recorte copiado): {antes / mib:8.2f} MiB/sessão")
+    print(f"depois (shared_dataset + Copy-on-Write):  {depois / mib:8.2f} MiB/sessão")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/parse_memory.py
+"""Pico de memória e tempo do parse das respostas: response.json() x jsonstream.
+
+O caminho atual monta a lista de dicts, o DataFrame a partir dela e converte
+as colunas; o streaming lê a resposta em blocos direto para arrays tipados.
+O corpo da resposta já está em memória nos dois casos e não entra na conta
+(no streaming de verdade ele nunca é materializado inteiro).
+
+Uso:
+    python -m benchmarks.parse_memory --rows 200000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from api_connector import CHUNK_SIZE, parse_commodity_response, parse_commodity_stream
+
+from benchmarks import stub_api
+from benchmarks.fixtures import STORE_MAX_ROWS
+
+
+def peak_bytes(func) -> int:
+    """Pico de memória alocada (bytes) durante uma chamada."""
+    gc.collect()
+    tracemalloc.start()
+    resultado = func()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return pico
+
+
+def seconds(func) -> float:
+    # Fora do tracemalloc, que deixa cada alocação bem mais lenta
+    gc.collect()
+    inicio = time.perf_counter()
+    func()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=STORE_MAX_ROWS,
+                        help=f"Pontos da resposta (datas diárias distintas: até {STORE_MAX_ROWS})")
+    args = parser.parse_args()
+
+    corpo = stub_api._body(args.rows)
+    blocos = [corpo[i:i + CHUNK_SIZE] for i in range(0, len(corpo), CHUNK_SIZE)]
+    caminhos = {
+        "response.json() + DataFrame": lambda: parse_commodity_response(json.loads(corpo)),
+        "jsonstream (blocos de 64 KiB)": lambda: parse_commodity_stream(iter(blocos)),
+    }
+
+    mib = 1024 ** 2
+    print(f"resposta: {args.rows} linhas, {len(corpo) / mib:.1f} MiB")
+    for nome, func in caminhos.items():
+        print(f"{nome:<30} pico {peak_bytes(func) / mib:8.1f} MiB  {seconds(func) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# benchmarks/runner.py
+"""Registro, execução e comparação dos benchmarks (estilo asv).
+
+Cada benchmark é uma função de preparação parametrizada: recebe uma
+combinação de parâmetros, monta os dados fora da medição e devolve a função
+sem argumentos que é cronometrada. Os resultados vão para um JSON com o
+commit medido, e `--compare` confronta dois arquivos para achar regressões.
+"""
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Tetos padrão dos parâmetros de tamanho (rodada completa: --max-rows 10000000)
+DEFAULT_MAX_ROWS = 100_000
+DEFAULT_MAX_REGIONS = 5_570
+
+
+class SkipBenchmark(Exception):
+    """Combinação de parâmetros sem sentido para o benchmark (ex: limite do formato)."""
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[..., Callable[[], object]]
+    params: dict = field(default_factory=dict)
+
+    def cases(self, limits: dict):
+        """Combinações de parâmetros dentro dos tetos de tamanho."""
+        valores = {
+            nome: [v for v in opcoes if nome not in limits or v <= limits[nome]]
+            for nome, opcoes in self.params.items()
+        }
+        nomes = list(valores)
+        for combinacao in itertools.product(*(valores[n] for n in nomes)):
+            yield dict(zip(nomes, combinacao))
+
+
+BENCHMARKS = []
+
+
+def benchmark(**params):
+    """Registra uma função de preparação parametrizada.
+
+    Example:
+        >>> @benchmark(rows=(12, 1_000), format_type=("CSV", "JSON"))
+        >>> def convert(rows, format_type):
+        >>>     df = price_frame(rows)
+        >>>     return lambda: convert_df(df, format_type)
+    """
+    def decorator(setup):
+        BENCHMARKS.append(Benchmark(setup.__name__, setup, params))
+        return setup
+    return decorator
+
+
+def case_key(name: str, params: dict) -> str:
+    return f"{name}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+
+
+def measure(func: Callable[[], object], repeat: int, max_time: float) -> dict:
+    """Uma execução de aquecimento e até `repeat` medições (ou `max_time` segundos)."""
+    func()
+    tempos = []
+    inicio = time.perf_counter()
+    while len(tempos) < repeat:
+        t0 = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - t0)
+        if time.perf_counter() - inicio > max_time:
+            break
+    return {"median": statistics.median(tempos), "min": min(tempos), "repeats": len(tempos)}
+
+
+def _git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        sujo = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+        return f"{commit}-dirty" if sujo else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def run(selected: list, limits: dict, repeat: int, max_time: float) -> dict:
+    resultados = {}
+    for bench in selected:
+        for params in bench.cases(limits):
+            chave = case_key(bench.name, params)
+            try:
+                resultado = measure(bench.setup(**params), repeat, max_time)
+            except SkipBenchmark as e:
+                print(f"{chave:<60} pulado ({e})")
+                continue
+            resultados[chave] = resultado
+            print(f"{chave:<60} {resultado['median'] * 1000:12.2f} ms  (n={resultado['repeats']})")
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "limits": limits,
+        },
+        "results": resultados,
+    }
+
+
+def compare(baseline: dict, atual: dict, threshold: float) -> list:
+    """Imprime a razão atual/base por caso e retorna as regressões."""
+    regressoes = []
+    base = baseline["results"]
+    print(f"\nbase {baseline['meta']['commit']} -> atual {atual['meta']['commit']}")
+    for chave, resultado in atual["results"].items():
+        if chave not in base:
+            continue
+        razao = resultado["median"] / base[chave]["median"]
+        marca = "  REGRESSÃO" if razao > threshold else ""
+        print(f"{chave:<60} {razao:6.2f}x{marca}")
+        if marca:
+            regressoes.append(chave)
+    return regressoes
+
+
+def main(argv=None):
+    # Registra os benchmarks
+    from benchmarks import cases  # noqa: F401
+    from dataplane import enable_copy_on_write
+
+    # Mesmo modo do pandas que o app ativa no start, já no primeiro caso
+    # (senão só valeria depois do primeiro rerun do app.py)
+    enable_copy_on_write()
+
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos de dados e renderização")
+    parser.add_argument("-k", "--filter", default="", help="Só benchmarks cujo nome contém o texto")
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS)
+    parser.add_argument("--max-regions", type=int, default=DEFAULT_MAX_REGIONS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-time", type=float, default=20.0, help="Segundos por caso")
+    parser.add_argument("-o", "--output", help="Grava os resultados em JSON")
+    parser.add_argument("--compare", help="JSON de referência (ex: rodada do commit anterior)")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Razão que conta como regressão")
+    args = parser.parse_args(argv)
+
+    selecionados = [b for b in BENCHMARKS if args.filter in b.name]
+    limites = {"rows": args.max_rows, "regions": args.max_regions}
+    atual = run(selecionados, limites, args.repeat, args.max_time)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(atual, indent=2), encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(baseline, atual, args.threshold):
+            sys.exit(1)
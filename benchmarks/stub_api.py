@@ -0,0 +1,69 @@
+# benchmarks/stub_api.py
+"""Servidor HTTP local que imita a Alpha Vantage para os benchmarks.
+
+O tamanho da resposta vem do nome da função pedida: `BENCH_1000` devolve
+1000 pontos (`BENCH_1000_2`, `BENCH_1000_3`... são séries distintas do mesmo
+tamanho). As respostas são serializadas uma vez e reaproveitadas, então
+o que se mede é o cliente (rede local, parse e gravação), não o servidor.
+
+Cada ponto tem uma data diária distinta, como na API: no máximo
+`STORE_MAX_ROWS` pontos cabem no intervalo do datetime64[ns].
+"""
+import argparse
+import json
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from benchmarks.fixtures import STORE_MAX_ROWS, STORE_START
+
+PREFIX = "BENCH_"
+
+
+@lru_cache(maxsize=8)
+def _body(rows: int) -> bytes:
+    # Datas repetidas mediriam o merge descartando linhas (e o cache de datas
+    # do to_datetime), não uma série desse tamanho
+    if rows > STORE_MAX_ROWS:
+        raise ValueError(f"Datas diárias distintas: no máximo {STORE_MAX_ROWS} pontos")
+    datas = pd.date_range(STORE_START, periods=rows, freq="D").strftime("%Y-%m-%d")
+    dados = [{"date": d, "value": f"{100 + (i % 97) * 0.5:.2f}"} for i, d in enumerate(datas)]
+    return json.dumps({"name": "Benchmark", "interval": "monthly", "data": dados}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        funcao = parse_qs(urlparse(self.path).query).get("function", [""])[0]
+        corpo = _body(int(funcao[len(PREFIX):].split("_")[0])) if funcao.startswith(PREFIX) else b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def start(port: int = 0) -> ThreadingHTTPServer:
+    """Sobe o servidor (porta livre por padrão) numa thread daemon."""
+    servidor = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def commodity_name(rows: int, series: int = None) -> str:
+    return f"{PREFIX}{rows}" if series is None else f"{PREFIX}{rows}_{series}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que imita a Alpha Vantage")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", args.port), _Handler)
+    print(f"Servindo em http://127.0.0.1:{args.port} (funções {PREFIX}<linhas>[_<série>])")
+    servidor.serve_forever()
@@ -1,7 +1,60 @@
+import base64
+import math
+
+import numpy as np
 import plotly.graph_objects as go
 import pandas as pd
+from instrumentation import timed
+
+# Linhas por página das tabelas: só a janela visível vai para o navegador
+PAGE_SIZE = 50
+
+
+def page_count(total_rows: int, page_size: int = PAGE_SIZE) -> int:
+    """Número de páginas (no mínimo 1, mesmo sem linhas)."""
+    return max(1, math.ceil(total_rows / page_size))
+
+
+def page_slice(df: pd.DataFrame, page: int, page_size: int = PAGE_SIZE) -> pd.DataFrame:
+    """Linhas da página `page` (base 0), limitada ao intervalo válido."""
+    page = min(max(page, 0), page_count(len(df), page_size) - 1)
+    return df.iloc[page * page_size:(page + 1) * page_size]
+
+
+def _is_number(serie: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie)
+
+
+def _column_values(serie: pd.Series, date_format: str) -> list:
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.strftime(date_format).tolist()
+    if _is_number(serie):
+        return serie.tolist()
+    return serie.astype(str).tolist()
+
+
+def table_values(df: pd.DataFrame, date_format: str = '%d/%m/%Y'):
+    """Valores das células de um go.Table, coluna a coluna.
+
+    Se todas as colunas são numéricas, vão como um único typed array
+    (float64 em base64, formato "colunas,linhas"): é a única forma que o
+    Plotly.js decodifica em `cells.values`, e o JSON fica bem menor que a
+    lista de floats em texto. Com colunas de texto/data, vai a lista comum.
+    """
+    if len(df.columns) and all(_is_number(df[col]) for col in df.columns):
+        dados = np.ascontiguousarray(df.to_numpy(dtype='<f8').T)
+        return {
+            'dtype': 'f8',
+            'bdata': base64.b64encode(dados.tobytes()).decode('ascii'),
+            'shape': f'{dados.shape[0]},{dados.shape[1]}',
+        }
+    return [_column_values(df[col], date_format) for col in df.columns]
 
-def create_interactive_table(df: pd.DataFrame):
+
+@timed("charts:interactive_table")
+def create_interactive_table(df: pd.DataFrame, page: int = 0, page_size: int = PAGE_SIZE):
+    """Tabela de uma página do DataFrame (ver `page_count` para a navegação)."""
+    df = page_slice(df, page, page_size)
     fig = go.Figure(data=[go.Table(
         header=dict(
             values=list(df.columns),
@@ -11,7 +64,7 @@ def create_interactive_table(df: pd.DataFrame):
             height=40
         ),
         cells=dict(
-            values=[df[col] for col in df.columns],
+            values=table_values(df),
             fill_color='rgba(58, 123, 213, 0.1)',
             align=['left', 'center', 'right'],  # Ajuste por tipo de dado
             font=dict(color='white', size=11),
@@ -19,4 +72,37 @@ def create_interactive_table(df: pd.DataFrame):
         )
     )])
     fig.update_layout(margin=dict(l=0, r=0, b=0, t=0))
-    return fig
\ No newline at end of file
+    return fig
+
+
+@timed("charts:price_table")
+def create_price_table(df: pd.DataFrame, page: int = 0, page_size: int = PAGE_SIZE):
+    """Tabela de preços (índice de datas + uma coluna por commodity), uma página por vez."""
+    pagina = page_slice(df, page, page_size)
+    colunas = list(pagina.columns)
+    # A coluna de datas impede o typed array (ver `table_values`): vai a lista comum
+    valores = [pagina[col].round(2).tolist() for col in colunas]
+    fig = go.Figure(data=[go.Table(
+        header=dict(
+            values=['<b>Data</b>'] + [f'<b>{col}</b>' for col in colunas],
+            fill_color='#1a2a6c',
+            align=['left'] + ['center']*len(colunas),
+            font=dict(color='white', size=14),
+            height=40
+        ),
+        cells=dict(
+            values=[pagina.index.strftime('%d/%m/%Y').tolist()] + valores,
+            fill_color='rgba(26, 42, 108, 0.3)',
+            align=['left'] + ['center']*len(colunas),
+            font=dict(color='white', size=12),
+            height=35,
+            format=[None] + [',.2f']*len(colunas)
+        )
+    )])
+
+    fig.update_layout(
+        margin=dict(l=0, r=0, t=0, b=0),
+        height=min(600, 35 * (len(pagina) + 1)),
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
@@ -5,4 +5,48 @@ load_dotenv()
 
 class Config:
     ALPHA_VANTAGE_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
-    MAPBOX_TOKEN = os.getenv("MAPBOX_ACCESS_TOKEN")
\ No newline at end of file
+    MAPBOX_TOKEN = os.getenv("MAPBOX_ACCESS_TOKEN")
+
+    # Armazenamento local (séries históricas e artefatos pré-processados)
+    DATA_DIR = os.getenv("AGROTECH_DATA_DIR", "data")
+    COMMODITY_STORE_DIR = os.getenv("COMMODITY_STORE_DIR", os.path.join(DATA_DIR, "commodities"))
+    # Idade máxima (s) do histórico local antes de consultar a API novamente
+    COMMODITY_REFRESH_SECONDS = int(os.getenv("COMMODITY_REFRESH_SECONDS", 3600))
+    # Compactação: uma partição (commodity, ano) com mais arquivos que isso é
+    # reescrita num só; os substituídos ficam no disco pelo prazo (s) abaixo,
+    # para leitores que ainda os referenciam
+    STORE_COMPACT_FILES = int(os.getenv("STORE_COMPACT_FILES", 16))
+    STORE_RETIRED_SECONDS = int(os.getenv("STORE_RETIRED_SECONDS", 300))
+
+    # Cliente HTTP da Alpha Vantage (URL base trocável por um servidor local de testes)
+    API_BASE_URL = os.getenv("ALPHA_VANTAGE_URL", "https://www.alphavantage.co")
+    API_MAX_WORKERS = int(os.getenv("API_MAX_WORKERS", 4))
+    API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 10))
+    API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", 30))
+    # Cota da Alpha Vantage (plano gratuito) e espera máxima na fila
+    API_CALLS_PER_MINUTE = int(os.getenv("API_CALLS_PER_MINUTE", 5))
+    API_CALLS_PER_DAY = int(os.getenv("API_CALLS_PER_DAY", 25))
+    API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", 60))
+    # Espera máxima do script por uma busca na API (o download segue em segundo plano)
+    API_WAIT_TIMEOUT = float(os.getenv("API_WAIT_TIMEOUT", 15))
+    # Validade das buscas em cache: um fallback (histórico/simulado após falha)
+    # é tentado de novo depois desse prazo, mesmo sem o histórico mudar
+    API_RETRY_SECONDS = int(os.getenv("API_RETRY_SECONDS", 120))
+
+    # Atualização em segundo plano: intervalo entre verificações, antecedência
+    # em relação ao vencimento do histórico e commodities buscadas desde o início
+    REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", 60))
+    REFRESH_AHEAD_SECONDS = int(os.getenv("REFRESH_AHEAD_SECONDS", 300))
+    PREFETCH_COMMODITIES = [c.strip() for c in os.getenv("PREFETCH_COMMODITIES", "").split(",") if c.strip()]
+
+    # Instrumentação dos reruns (painel de depuração, log JSON e métricas Prometheus)
+    INSTRUMENTATION = os.getenv("AGROTECH_INSTRUMENTATION", "").lower() in ("1", "true", "yes", "on")
+    METRICS_FILE = os.getenv("AGROTECH_METRICS_FILE")
+
+    # Geometrias estaduais: shapefile de origem e índice pré-processado
+    GEO_SOURCE = os.getenv("GEO_SOURCE", "dados.shp")
+    GEO_DIR = os.getenv("GEO_DIR", os.path.join(DATA_DIR, "geo"))
+    # Arquivos servidos pelo Streamlit em app/static (server.enableStaticServing)
+    STATIC_DIR = os.getenv("STATIC_DIR", "static")
+    # Base de pontos de produtividade (lon, lat, produtividade, area_ha) agregada por estado
+    YIELD_POINTS_FILE = os.getenv("YIELD_POINTS_FILE", os.path.join(DATA_DIR, "produtividade_pontos.parquet"))
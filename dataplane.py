@@ -0,0 +1,62 @@
+# dataplane.py
+"""Plano de dados compartilhado entre sessões.
+
+Com `st.cache_data` cada chamada devolve uma cópia desserializada do
+resultado, então a memória cresce com o número de sessões. Aqui os datasets
+ficam em `st.cache_resource` (um objeto por processo) e cada sessão recebe
+uma visão rasa: com o Copy-on-Write do pandas, recortes e filtros não copiam
+dados, e uma escrita feita por uma sessão copia só a coluna alterada, sem
+afetar o objeto compartilhado.
+
+O módulo não muda opções globais do pandas ao ser importado: quem serve as
+visões (o app, no start) chama `enable_copy_on_write` uma vez.
+"""
+import functools
+
+import pandas as pd
+import streamlit as st
+
+
+def enable_copy_on_write() -> None:
+    """Ativa o Copy-on-Write no processo inteiro (padrão a partir do pandas 3).
+
+    Sem ele as visões de `session_view` compartilham os dados de verdade: uma
+    escrita numa sessão alteraria o dataset de todas.
+    """
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def session_view(obj):
+    """Visão rasa (sem cópia de dados) de um DataFrame/Series compartilhado.
+
+    Outros objetos (dicts de GeoJSON, por exemplo) são devolvidos como estão e
+    devem ser tratados como somente leitura.
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return obj.copy(deep=False)
+    return obj
+
+
+def shared_dataset(func=None, *, max_entries: int = None):
+    """Decorador: resultado calculado uma vez por processo e entregue a cada
+    chamada como visão rasa (ver `session_view`).
+
+    Example:
+        >>> @shared_dataset(max_entries=16)
+        >>> def load_data(version):
+        >>>     ...
+    """
+    def decorator(f):
+        cached = st.cache_resource(max_entries=max_entries, show_spinner=False)(f)
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            return session_view(cached(*args, **kwargs))
+
+        wrapper.clear = cached.clear
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
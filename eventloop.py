@@ -0,0 +1,84 @@
+# eventloop.py
+"""Event loop asyncio persistente para o script do Streamlit.
+
+O script é síncrono e roda de novo a cada interação: um `asyncio.run` por
+rerun criaria e destruiria o loop (e as tarefas em andamento) toda vez. Aqui
+um único loop vive numa thread daemon do processo, iniciada sob demanda como
+a do `refresher`, e o script conversa com ele por dois caminhos:
+
+- `submit`: agenda a corrotina e devolve um `concurrent.futures.Future`; o
+  script segue renderizando e consulta o Future nos próximos reruns
+- `run`: espera o resultado até um prazo; vencido o prazo, a tarefa é
+  cancelada no loop e o chamador recebe `TimeoutError`
+
+Trabalho bloqueante (requests, leitura do histórico) vai para o executor do
+loop com `loop.run_in_executor`, sem travar as demais tarefas.
+"""
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine
+
+from config import Config
+
+
+class BackgroundLoop:
+    """Loop asyncio numa thread daemon, compartilhado por todas as sessões.
+
+    Example:
+        >>> future = event_loop.submit(fetch_many_async(["WHEAT", "CORN"]))
+        >>> if future.done():
+        >>>     resultados = future.result()
+        >>> event_loop.run(asyncio.sleep(5), timeout=1)  # TimeoutError
+    """
+
+    def __init__(self, max_workers: int = None, name: str = "agrotech-asyncio"):
+        self.max_workers = max_workers or Config.API_MAX_WORKERS
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """O loop em execução (a thread é criada no primeiro uso)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                # Executor próprio: as chamadas bloqueantes não disputam o executor padrão do processo
+                self._loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=f"{self.name}-io"))
+                self._thread = threading.Thread(target=self._run, args=(self._loop,), name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Agenda a corrotina no loop sem esperar (thread-safe)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: float = None) -> Any:
+        """Executa a corrotina no loop e espera o resultado.
+
+        Args:
+            coro (Coroutine): Corrotina a executar
+            timeout (float, optional): Prazo em segundos. Defaults to None (sem prazo).
+
+        Raises:
+            TimeoutError: O prazo venceu (a tarefa foi cancelada no loop)
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run chamado de dentro do próprio loop (use await)")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()  # CancelledError dentro da corrotina, no próximo await
+            raise TimeoutError(f"Sem resposta em {timeout:g}s") from None
+
+
+event_loop = BackgroundLoop()
@@ -0,0 +1,110 @@
+# exports.py
+"""Exportação sob demanda.
+
+Os arquivos só são gerados quando o usuário clica em baixar (o
+`st.download_button` recebe um callable) e ficam em cache por
+(estado dos filtros, formato), então reruns não serializam nada.
+"""
+import json
+import os
+from io import BytesIO
+from typing import Callable, Iterator
+
+import pandas as pd
+import streamlit as st
+
+# Formato -> (extensão, MIME)
+DATAFRAME_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "JSON": ("json", "application/json"),
+}
+GEO_FORMATS = {
+    "GeoJSON": ("geojson", "application/geo+json"),
+    "Shapefile": ("zip", "application/zip"),
+}
+
+# Linhas por bloco ao serializar CSV/JSON em partes
+CHUNK_ROWS = 50_000
+
+
+def iter_export_chunks(df: pd.DataFrame, format_type: str, index: bool = True,
+                       chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """Serializa o DataFrame em blocos de `chunk_rows` linhas (CSV ou JSON).
+
+    Limita o texto intermediário gerado pelo pandas a um bloco por vez. O
+    `st.download_button` precisa do conteúdo completo (um callable que devolve
+    um gerador também é convertido para bytes), então `convert_df` junta os
+    blocos antes de entregar o arquivo.
+    """
+    if format_type == "CSV":
+        for start in range(0, max(len(df), 1), chunk_rows):
+            bloco = df.iloc[start:start + chunk_rows]
+            yield bloco.to_csv(index=index, header=(start == 0)).encode('utf-8')
+    elif format_type == "JSON":
+        yield b"["
+        for start in range(0, len(df), chunk_rows):
+            registros = df.iloc[start:start + chunk_rows].to_json(orient='records')
+            yield (b"," if start else b"") + registros[1:-1].encode('utf-8')
+        yield b"]"
+    else:
+        raise ValueError(f"Formato sem suporte a blocos: {format_type}")
+
+
+def convert_df(df: pd.DataFrame, format_type: str, index: bool = True) -> bytes:
+    """Converte DataFrame para diferentes formatos"""
+    if format_type == "Excel":
+        output = BytesIO()
+        # Sem constant_memory: o pandas grava coluna a coluna e esse modo só
+        # mantém a linha atual, descartando as anteriores
+        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+            df.to_excel(writer, index=index)
+        return output.getvalue()
+    return b"".join(iter_export_chunks(df, format_type, index=index))
+
+
+def geojson_to_shapefile_zip(geojson: dict, name: str = "dados") -> bytes:
+    """Grava o Shapefile uma única vez em diretório temporário e compacta todos os arquivos."""
+    import tempfile
+    import zipfile
+
+    import geopandas as gpd
+
+    gdf = gpd.GeoDataFrame.from_features(geojson['features'], crs="EPSG:4326")
+    buffer = BytesIO()
+    with tempfile.TemporaryDirectory() as tmp:
+        gdf.to_file(os.path.join(tmp, f"{name}.shp"), driver='ESRI Shapefile')
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for arquivo in sorted(os.listdir(tmp)):
+                zipf.write(os.path.join(tmp, arquivo), arquivo)
+    return buffer.getvalue()
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _cached_dataframe_export(cache_key: tuple, format_type: str, index: bool, _df: pd.DataFrame) -> bytes:
+    return convert_df(_df, format_type, index=index)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _cached_geo_export(cache_key: tuple, format_type: str, _geojson: dict) -> bytes:
+    if format_type == "Shapefile":
+        return geojson_to_shapefile_zip(_geojson)
+    return json.dumps(_geojson, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dataframe_export(df: pd.DataFrame, format_type: str, cache_key: tuple,
+                     index: bool = True) -> Callable[[], bytes]:
+    """Callable para o `data` do st.download_button (gera só no clique).
+
+    Args:
+        df (pd.DataFrame): Dados já filtrados
+        format_type (str): "CSV", "Excel" ou "JSON"
+        cache_key (tuple): Identifica o estado dos filtros que produziu `df`
+        index (bool, optional): Exporta o índice. Defaults to True.
+    """
+    return lambda: _cached_dataframe_export(cache_key, format_type, index, df)
+
+
+def geodata_export(geojson: dict, format_type: str, cache_key: tuple) -> Callable[[], bytes]:
+    """Callable para exportar o GeoJSON como "GeoJSON" ou "Shapefile" (zip)."""
+    return lambda: _cached_geo_export(cache_key, format_type, geojson)
@@ -0,0 +1,213 @@
+# geodata.py
+"""Índice local de geometrias estaduais.
+
+O shapefile `dados.shp` é empacotado uma única vez (`python geodata.py`) em
+GeoJSON pré-serializados, um por nível de simplificação. Em execução o app só
+lê esses arquivos: nada de HTTP nem de geopandas no caminho de inicialização.
+"""
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from config import Config
+
+# Dados de exemplo (substitua pelos seus)
+PRODUTIVIDADE_ESTADUAL = {
+    "AC": 50.0, "AL": 48.0, "AP": 52.0, "AM": 55.0,
+    "BA": 48.9, "CE": 47.0, "DF": 60.0, "ES": 53.0,
+    "GO": 59.1, "MA": 46.0, "MT": 60.5, "MS": 61.2,
+    "MG": 52.3, "PA": 49.0, "PB": 47.5, "PR": 58.2,
+    "PE": 48.0, "PI": 47.0, "RJ": 54.0, "RN": 47.0,
+    "RS": 55.8, "RO": 53.0, "RR": 51.0, "SC": 57.0,
+    "SP": 56.7, "SE": 48.5, "TO": 50.0
+}
+
+# Tolerância de simplificação (graus) por nível de detalhe
+SIMPLIFICATION_LEVELS = {
+    "alta": 0.005,
+    "media": 0.02,
+    "baixa": 0.05,
+}
+DEFAULT_LEVEL = "media"
+
+# Nível servido por faixa de zoom do Leaflet: (zoom mínimo, nível).
+# No zoom 4 (Brasil inteiro) 1 px ~ 0.04 grau, então "baixa" não perde detalhe visível.
+ZOOM_LEVELS = [(0, "baixa"), (6, "media"), (8, "alta")]
+
+# 4 casas decimais ~ 11 m: suficiente para a escala estadual
+COORD_PRECISION = 4
+
+PROPERTIES = ['sigla', 'nome', 'regiao_id', 'codigo_ibg', 'produtividade']
+
+# Arquivos que compõem o shapefile (entram no hash da origem quando existem)
+SHAPEFILE_PARTS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+# Registro, ao lado dos GeoJSON, do hash da origem usada na geração: os
+# arquivos gerados são versionados no git, então a data de modificação após
+# um checkout não diz nada sobre a origem
+SOURCE_FILE = "source.json"
+
+_source_hashes = {}
+
+
+def geojson_path(level: str, out_dir: str = None) -> Path:
+    return Path(out_dir or Config.GEO_DIR) / f"estados_{level}.geojson"
+
+
+def source_hash(source: str = None) -> Optional[str]:
+    """SHA-1 do conteúdo do shapefile (None se não existe), memorizado por
+    (tamanho, mtime) de cada parte para não reler a cada verificação."""
+    source = Path(source or Config.GEO_SOURCE)
+    partes = [p for p in (source.with_suffix(s) for s in SHAPEFILE_PARTS) if p.exists()]
+    if not partes:
+        return None
+    chave = tuple((p.name, p.stat().st_size, p.stat().st_mtime_ns) for p in partes)
+    if _source_hashes.get(source) is None or _source_hashes[source][0] != chave:
+        assinatura = hashlib.sha1()
+        for p in partes:
+            assinatura.update(p.suffix.encode())
+            assinatura.update(p.read_bytes())
+        _source_hashes[source] = (chave, assinatura.hexdigest())
+    return _source_hashes[source][1]
+
+
+def build_geodata(source: str = None, out_dir: str = None) -> dict:
+    """Gera os GeoJSON simplificados a partir do shapefile.
+
+    A simplificação é feita sobre a cobertura inteira (`coverage_simplify`),
+    então divisas compartilhadas entre estados continuam coincidindo.
+
+    Returns:
+        dict: nível -> caminho do arquivo gerado
+    """
+    import geopandas as gpd
+    import numpy as np
+    import shapely
+
+    gdf = gpd.read_file(source or Config.GEO_SOURCE)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(epsg=4326)  # dados.shp não traz .prj (lon/lat WGS84)
+
+    # Merge vetorizado em vez de laço por feature
+    gdf['produtividade'] = gdf['sigla'].map(PRODUTIVIDADE_ESTADUAL).fillna(0).astype(float)
+    gdf['nome'] = gdf['nome'].fillna(gdf['name'])
+    gdf = gdf[PROPERTIES + ['geometry']]
+
+    geometrias = shapely.make_valid(gdf.geometry.values)
+    saida = {}
+    for level, tolerance in SIMPLIFICATION_LEVELS.items():
+        if hasattr(shapely, 'coverage_simplify'):
+            simplificadas = shapely.coverage_simplify(geometrias, tolerance)
+        else:
+            simplificadas = shapely.simplify(geometrias, tolerance, preserve_topology=True)
+        simplificadas = shapely.transform(simplificadas, lambda c: np.round(c, COORD_PRECISION))
+
+        # bbox por feature: filtros por área sem tocar nas coordenadas
+        geojson = json.loads(gdf.set_geometry(simplificadas).to_json(drop_id=True, show_bbox=True))
+        path = geojson_path(level, out_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Grava ao lado e troca de uma vez: leitores nunca veem arquivo pela metade
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(geojson, separators=(',', ':'), ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, path)
+        saida[level] = path
+
+    registro = Path(out_dir or Config.GEO_DIR) / SOURCE_FILE
+    tmp = registro.with_name(f".{registro.name}.tmp")
+    tmp.write_text(json.dumps({"source_sha1": source_hash(source)}) + "\n", encoding='utf-8')
+    os.replace(tmp, registro)
+    return saida
+
+
+def load_state_geojson(level: str = DEFAULT_LEVEL, out_dir: str = None) -> dict:
+    """Lê o GeoJSON pré-processado do nível pedido (gera o índice se faltar)."""
+    if level not in SIMPLIFICATION_LEVELS:
+        raise ValueError(f"Nível de detalhe desconhecido: {level}")
+    path = geojson_path(level, out_dir)
+    if not path.exists():
+        build_geodata(out_dir=out_dir)
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def publish_geodata(level: str = DEFAULT_LEVEL, out_dir: str = None, static_dir: str = None) -> str:
+    """Publica a geometria do nível como arquivo estático (app/static).
+
+    Vão só geometria, sigla e nome: os valores exibidos seguem à parte, a cada
+    rerun. O nome do arquivo leva a versão do índice, então o navegador nunca
+    reaproveita geometria antiga; versões anteriores do nível são apagadas.
+
+    Returns:
+        str: Caminho relativo a app/static (ex: "geo/estados_media_1a2b3c4d5e.json")
+    """
+    origem = geojson_path(level, out_dir)
+    if not origem.exists():
+        build_geodata(out_dir=out_dir)
+    stat = origem.stat()
+    assinatura = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:10]
+    nome = f"geo/estados_{level}_{assinatura}.json"
+    destino = Path(static_dir or Config.STATIC_DIR) / nome
+    if destino.exists():
+        return nome
+
+    geojson = load_state_geojson(level, out_dir)
+    features = [
+        {"type": "Feature",
+         "properties": {k: f['properties'][k] for k in ('sigla', 'nome')},
+         "geometry": f['geometry']}
+        for f in geojson['features']
+    ]
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_name(f".{destino.name}.tmp")
+    tmp.write_text(json.dumps({"type": "FeatureCollection", "features": features},
+                              separators=(',', ':'), ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp, destino)
+    for antigo in destino.parent.glob(f"estados_{level}_*.json"):
+        if antigo != destino:
+            antigo.unlink(missing_ok=True)
+    return nome
+
+
+def geodata_version(out_dir: str = None) -> str:
+    """Identificador dos arquivos gerados (muda quando o índice é regenerado)."""
+    partes = []
+    for level in SIMPLIFICATION_LEVELS:
+        path = geojson_path(level, out_dir)
+        partes.append(f"{level}:{path.stat().st_mtime_ns if path.exists() else 0}")
+    return "|".join(partes)
+
+
+def geodata_is_stale(source: str = None, out_dir: str = None) -> bool:
+    """True se falta algum nível ou o índice foi gerado de outro conteúdo do
+    shapefile (hash gravado em `SOURCE_FILE` por `build_geodata`)."""
+    if not all(geojson_path(level, out_dir).exists() for level in SIMPLIFICATION_LEVELS):
+        return True
+    origem = source_hash(source)
+    if origem is None:
+        return False  # Sem shapefile não há como regerar: vale o índice existente
+    try:
+        registro = json.loads((Path(out_dir or Config.GEO_DIR) / SOURCE_FILE).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return True
+    return registro.get("source_sha1") != origem
+
+
+def level_for_zoom(zoom: float = None) -> str:
+    """Nível de simplificação adequado ao zoom atual do mapa."""
+    level = ZOOM_LEVELS[0][1]
+    for min_zoom, nome in ZOOM_LEVELS:
+        if zoom is not None and zoom >= min_zoom:
+            level = nome
+    return level
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Empacota as geometrias estaduais em GeoJSON simplificados")
+    parser.add_argument("--source", default=Config.GEO_SOURCE, help="Shapefile de origem")
+    parser.add_argument("--out-dir", default=Config.GEO_DIR, help="Diretório de saída")
+    args = parser.parse_args()
+
+    for level, path in build_geodata(args.source, args.out_dir).items():
+        print(f"{level:>6}: {path} ({path.stat().st_size / 1024:.0f} KiB)")
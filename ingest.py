@@ -0,0 +1,129 @@
+# ingest.py
+"""Carga em lote do histórico de commodities (backfill), fora do Streamlit.
+
+Download, parse do JSON e normalização (`to_datetime`, `to_numeric`, ordenação)
+de cada série rodam num pool de processos, sem disputar o GIL do app, e o
+resultado vai para o mesmo TimeSeriesStore que o dashboard lê. As gravações do
+store já são atômicas e cada commodity tem a sua partição, então os workers
+gravam direto e só devolvem contagens ao processo principal.
+
+Exemplo (servidor local de testes):
+    python -m benchmarks.stub_api --port 8765
+    python ingest.py BENCH_100000_1 BENCH_100000_2 --base-url http://127.0.0.1:8765 --no-rate-limit
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import requests
+from api_connector import (CHUNK_SIZE, RateLimitError, TokenBucket, acquire_all, commodity_url,
+                           parse_commodity_stream)
+from config import Config
+from storage import TimeSeriesStore
+
+# Estado de cada processo do pool (criado no `_init_worker`)
+_session = None
+_store = None
+
+
+def _init_worker(root: str) -> None:
+    global _session, _store
+    _session = requests.Session()  # Conexões reaproveitadas entre as séries do mesmo worker
+    _store = TimeSeriesStore(root)
+
+
+def ingest_commodity(commodity: str, base_url: str = None) -> dict:
+    """Baixa, normaliza e grava uma série (roda dentro de um worker).
+
+    Returns:
+        dict: commodity, linhas recebidas, total no histórico e segundos gastos
+    """
+    inicio = time.perf_counter()
+    timeout = (Config.API_CONNECT_TIMEOUT, Config.API_READ_TIMEOUT)
+    with _session.get(commodity_url(commodity, base_url), timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        df = parse_commodity_stream(response.iter_content(CHUNK_SIZE))
+    if df is None:
+        raise LookupError(f"{commodity}: dados não encontrados na API")
+    historico = _store.merge(commodity, df)
+    return {
+        "commodity": commodity,
+        "linhas": len(df),
+        "total": len(historico),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def ingest(commodities: list, root: str = None, workers: int = None,
+           base_url: str = None, rate_limit: bool = True) -> list:
+    """Carrega várias commodities em paralelo, respeitando a cota da API.
+
+    Args:
+        commodities (list): Funções da Alpha Vantage (ex: ["WHEAT", "CORN"])
+        root (str, optional): Diretório do store. Defaults to Config.COMMODITY_STORE_DIR.
+        workers (int, optional): Processos do pool. Defaults to os.cpu_count().
+        base_url (str, optional): URL base da API. Defaults to Config.API_BASE_URL.
+        rate_limit (bool, optional): Aplica as cotas por minuto/dia de Config.
+            Defaults to True.
+
+    Returns:
+        list: Um dict por commodity (ver `ingest_commodity`), com `erro` nas que falharam
+    """
+    commodities = list(dict.fromkeys(commodities))  # Remove duplicadas
+    root = str(root or Config.COMMODITY_STORE_DIR)
+    workers = min(len(commodities), workers or os.cpu_count() or 1) or 1
+    # A cota vale para o processo inteiro: o envio ao pool é que entra na fila
+    buckets = [
+        TokenBucket(Config.API_CALLS_PER_MINUTE, 60),
+        TokenBucket(Config.API_CALLS_PER_DAY, 24 * 3600),
+    ] if rate_limit else []
+
+    resultados = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(root,)) as pool:
+        futures = {}
+        for commodity in commodities:
+            try:
+                acquire_all(buckets, Config.API_QUEUE_TIMEOUT)
+            except RateLimitError as e:
+                resultados.append({"commodity": commodity, "erro": str(e)})
+                continue
+            futures[pool.submit(ingest_commodity, commodity, base_url)] = commodity
+
+        for future in as_completed(futures):
+            try:
+                resultados.append(future.result())
+            except Exception as e:
+                resultados.append({"commodity": futures[future], "erro": str(e)})
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carrega o histórico de commodities no armazenamento local")
+    parser.add_argument("commodities", nargs="*", default=Config.PREFETCH_COMMODITIES,
+                        help="Funções da Alpha Vantage (padrão: PREFETCH_COMMODITIES)")
+    parser.add_argument("--workers", type=int, help="Processos do pool (padrão: núcleos da máquina)")
+    parser.add_argument("--root", default=Config.COMMODITY_STORE_DIR, help="Diretório do armazenamento")
+    parser.add_argument("--base-url", default=Config.API_BASE_URL, help="URL base da API")
+    parser.add_argument("--no-rate-limit", action="store_true",
+                        help="Ignora as cotas da API (só para servidores locais)")
+    args = parser.parse_args()
+    if not args.commodities:
+        parser.error("informe as commodities ou defina PREFETCH_COMMODITIES")
+
+    inicio = time.perf_counter()
+    resultados = ingest(args.commodities, args.root, args.workers, args.base_url, not args.no_rate_limit)
+    duracao = time.perf_counter() - inicio
+
+    falhas = [r for r in resultados if "erro" in r]
+    for r in resultados:
+        if "erro" in r:
+            print(f"{r['commodity']:<20} ERRO: {r['erro']}")
+        else:
+            print(f"{r['commodity']:<20} {r['linhas']:>10} linhas em {r['segundos']:.2f}s "
+                  f"({r['total']} no histórico)")
+    linhas = sum(r.get("linhas", 0) for r in resultados)
+    print(f"{linhas} linhas de {len(resultados) - len(falhas)} séries em {duracao:.2f}s "
+          f"({linhas / duracao:,.0f} linhas/s)")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,224 @@
+# instrumentation.py
+"""Instrumentação opcional dos reruns (AGROTECH_INSTRUMENTATION=1).
+
+Cronometra estágios nomeados e conta hits/misses dos caches principais. Os
+números de cada rerun aparecem num painel de depuração na sidebar e vão para
+o log em uma linha JSON; os acumulados do processo são expostos em formato
+texto do Prometheus (`prometheus_text`, e no arquivo Config.METRICS_FILE se
+definido). Desligada, os decoradores devolvem a função original e `stage`
+é um contexto vazio: nenhum custo no caminho da requisição.
+"""
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+import streamlit as st
+from config import Config
+
+ENABLED = Config.INSTRUMENTATION
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_stages = {}  # estágio -> [chamadas, segundos totais, maior duração]
+_caches = {}  # (cache, "hit"|"miss") -> contagem
+_local = threading.local()  # Registro do rerun em andamento (uma thread por sessão)
+
+
+def _rerun():
+    return getattr(_local, "rerun", None)
+
+
+def _record_stage(name: str, seconds: float) -> None:
+    with _lock:
+        total = _stages.setdefault(name, [0, 0.0, 0.0])
+        total[0] += 1
+        total[1] += seconds
+        total[2] = max(total[2], seconds)
+    rerun = _rerun()
+    if rerun is not None:
+        rerun["stages"].append((name, seconds))
+
+
+def _record_cache(name: str, hit: bool) -> None:
+    resultado = "hit" if hit else "miss"
+    with _lock:
+        _caches[(name, resultado)] = _caches.get((name, resultado), 0) + 1
+    rerun = _rerun()
+    if rerun is not None:
+        rerun["caches"].append((name, resultado))
+
+
+@contextmanager
+def _timer(name: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(name, time.perf_counter() - inicio)
+
+
+def stage(name: str):
+    """Cronometra um trecho: `with stage("mapa:render"): ...`."""
+    return _timer(name) if ENABLED else nullcontext()
+
+
+def timed(name: str = None):
+    """Decorador: cronometra cada chamada da função como o estágio `name`."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        nome = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _timer(nome):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def track_cache(name: str):
+    """Conta hits/misses de uma função em cache.
+
+    Usado aos pares: `track_cache` por fora do decorador de cache e
+    `cache_probe` por dentro (o corpo só roda em miss). Também cronometra a
+    chamada como o estágio `name`.
+
+    Example:
+        >>> @track_cache("load_data")
+        >>> @st.cache_data
+        >>> @cache_probe("load_data")
+        >>> def load_data(version):
+        >>>     ...
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            sondas = _local.__dict__.setdefault("probes", {})
+            anterior = sondas.get(name)
+            sondas[name] = False
+            try:
+                with _timer(name):
+                    return func(*args, **kwargs)
+            finally:
+                _record_cache(name, hit=not sondas[name])
+                sondas[name] = anterior
+        return wrapper
+    return decorator
+
+
+def cache_probe(name: str):
+    """Marca o miss do cache `name` (ver `track_cache`)."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            sondas = _local.__dict__.setdefault("probes", {})
+            if name in sondas:
+                sondas[name] = True
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_rerun() -> None:
+    """Abre o registro do rerun atual (chamar no topo do script)."""
+    if ENABLED:
+        _local.rerun = {"start": time.perf_counter(), "stages": [], "caches": []}
+
+
+def finish_rerun() -> dict:
+    """Fecha o registro do rerun, grava a linha de log e as métricas em arquivo.
+
+    Returns:
+        dict: total, estágios e eventos de cache do rerun (vazio se desligado)
+    """
+    rerun = _rerun()
+    if not ENABLED or rerun is None:
+        return {}
+    _local.rerun = None
+    total = time.perf_counter() - rerun["start"]
+    _record_stage("rerun", total)
+    resumo = {"event": "rerun", "seconds": round(total, 6),
+              "stages": [{"stage": n, "seconds": round(s, 6)} for n, s in rerun["stages"]],
+              "caches": [{"cache": n, "result": r} for n, r in rerun["caches"]]}
+    logger.info(json.dumps(resumo, ensure_ascii=False))
+    if Config.METRICS_FILE:
+        _write_metrics(Config.METRICS_FILE)
+    return resumo
+
+
+def _escape(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """Acumulados do processo no formato texto do Prometheus."""
+    with _lock:
+        stages = {k: list(v) for k, v in _stages.items()}
+        caches = dict(_caches)
+
+    linhas = [
+        "# HELP agrotech_stage_seconds Duração dos estágios dos reruns.",
+        "# TYPE agrotech_stage_seconds summary",
+    ]
+    for nome, (chamadas, soma, _) in sorted(stages.items()):
+        linhas.append(f'agrotech_stage_seconds_count{{stage="{_escape(nome)}"}} {chamadas}')
+        linhas.append(f'agrotech_stage_seconds_sum{{stage="{_escape(nome)}"}} {soma:.6f}')
+    linhas += [
+        "# HELP agrotech_stage_max_seconds Maior duração observada por estágio.",
+        "# TYPE agrotech_stage_max_seconds gauge",
+    ]
+    for nome, (_, _, maximo) in sorted(stages.items()):
+        linhas.append(f'agrotech_stage_max_seconds{{stage="{_escape(nome)}"}} {maximo:.6f}')
+    linhas += [
+        "# HELP agrotech_cache_requests_total Consultas aos caches por resultado.",
+        "# TYPE agrotech_cache_requests_total counter",
+    ]
+    for (nome, resultado), contagem in sorted(caches.items()):
+        linhas.append(f'agrotech_cache_requests_total{{cache="{_escape(nome)}",result="{resultado}"}} {contagem}')
+    return "\n".join(linhas) + "\n"
+
+
+def _write_metrics(path: str) -> None:
+    # Troca atômica: o coletor (ex: textfile do node_exporter) nunca lê arquivo pela metade
+    # Um temporário por gravação: sessões são threads do mesmo processo e
+    # podem gravar ao mesmo tempo
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(path) or ".",
+                                     prefix=f"{os.path.basename(path)}.", suffix=".tmp",
+                                     delete=False) as f:
+        f.write(prometheus_text())
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+def render_debug_panel() -> None:
+    """Fecha o rerun e mostra os tempos na sidebar (só com a instrumentação ligada)."""
+    resumo = finish_rerun()
+    if not resumo:
+        return
+
+    with st.sidebar.expander("🛠️ Instrumentação", expanded=False):
+        st.metric("Rerun", f"{resumo['seconds'] * 1000:.0f} ms")
+        if resumo["stages"]:
+            estagios = pd.DataFrame(resumo["stages"])
+            estagios["ms"] = estagios.pop("seconds") * 1000
+            st.dataframe(estagios, hide_index=True)
+        if resumo["caches"]:
+            st.dataframe(pd.DataFrame(resumo["caches"]), hide_index=True)
+        st.code(prometheus_text(), language="text")
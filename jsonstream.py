@@ -0,0 +1,166 @@
+# jsonstream.py
+"""Parse em streaming das séries da Alpha Vantage.
+
+`response.json()` materializa a resposta inteira como dicts Python, o
+DataFrame é montado a partir dessa lista e as colunas ainda são convertidas
+depois: três cópias completas dos dados. Aqui a resposta é lida em blocos e
+cada bloco vira direto um pedaço dos arrays numpy `date`/`value`, já tipados;
+o pico de memória fica em um bloco de texto mais os arrays finais.
+
+O caminho rápido reconhece os itens `{"date": "...", "value": "..."}` com uma
+regex sobre o bloco inteiro. Qualquer coisa fora desse formato (outra ordem
+de chaves, escapes, números sem aspas) cai no `json.JSONDecoder.raw_decode`,
+item a item, com o mesmo resultado.
+"""
+import codecs
+import json
+import re
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+_DATA_START = re.compile(r'"data"\s*:\s*\[')
+_ITEM = re.compile(r'\{\s*"date"\s*:\s*"([^"\\]*)"\s*,\s*"value"\s*:\s*"([^"\\]*)"\s*\}')
+_SEPARATORS = " \t\r\n,"
+
+# Datas ISO só com o dia ("2024-11-01") são convertidas pelo próprio numpy
+_ISO_DAY_LENGTH = len("2024-11-01")
+
+
+def _to_dates(textos) -> np.ndarray:
+    datas = np.array(textos, dtype=str)
+    if datas.dtype.itemsize <= _ISO_DAY_LENGTH * datas.dtype.alignment:
+        try:
+            return datas.astype("datetime64[D]").astype("datetime64[ns]")
+        except ValueError:
+            pass
+    return pd.to_datetime(pd.Series(datas), errors="coerce").to_numpy("datetime64[ns]")
+
+
+def _to_values(textos) -> np.ndarray:
+    valores = np.array(textos, dtype=str)
+    try:
+        return valores.astype(np.float64)
+    except ValueError:
+        # Valores ausentes (a Alpha Vantage usa ".") viram NaN, como no to_numeric
+        return pd.to_numeric(pd.Series(valores), errors="coerce").to_numpy(np.float64)
+
+
+class SeriesStreamParser:
+    """Monta os arrays (date, value) de uma resposta JSON recebida em blocos.
+
+    Example:
+        >>> parser = SeriesStreamParser()
+        >>> for chunk in response.iter_content(CHUNK_SIZE):
+        >>>     parser.feed(chunk)
+        >>> dates, values = parser.close()
+        >>> parser.metadata()  # Demais campos (ex: "Note" de cota excedida)
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._head = None  # Texto até o "[" de "data" (None enquanto não apareceu)
+        self._tail = None  # Texto depois do "]" (None enquanto o array não fechou)
+        self._dates, self._values = [], []
+
+    @property
+    def found(self) -> bool:
+        """Se a resposta tem o array "data"."""
+        return self._head is not None
+
+    def feed(self, chunk: bytes) -> None:
+        self._buffer += self._decoder.decode(chunk)
+        self._consume()
+
+    def close(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Fecha a leitura e devolve os arrays (datetime64[ns], float64).
+
+        Raises:
+            ValueError: A resposta terminou no meio do array "data"
+        """
+        self._buffer += self._decoder.decode(b"", final=True)
+        self._consume()
+        if self.found and self._tail is None:
+            raise ValueError('Resposta JSON incompleta: o array "data" não foi fechado')
+        if not self._dates:
+            return np.array([], dtype="datetime64[ns]"), np.array([], dtype=np.float64)
+        return np.concatenate(self._dates), np.concatenate(self._values)
+
+    def metadata(self) -> dict:
+        """A resposta sem os itens de "data" (chamar depois de `close`)."""
+        if not self.found:
+            return json.loads(self._buffer or "{}")
+        return json.loads(self._head + "]" + self._tail)
+
+    def _consume(self) -> None:
+        if self._tail is not None:
+            self._tail += self._buffer
+            self._buffer = ""
+            return
+        if self._head is None:
+            inicio = _DATA_START.search(self._buffer)
+            if inicio is None:
+                return
+            self._head = self._buffer[:inicio.end()]
+            self._buffer = self._buffer[inicio.end():]
+
+        # Caminho rápido: o trecho até o fim do array (ou até o último item
+        # completo do bloco) só pode ter itens no formato esperado. Cada item
+        # reconhecido tem exatamente 1 "{" e 8 aspas; sobrando chaves ou aspas,
+        # há item em outro formato e o trecho vai para o decodificador
+        fim = self._buffer.find("]")
+        corte = fim if fim >= 0 else self._buffer.rfind("}") + 1
+        trecho = self._buffer[:corte]
+        itens = _ITEM.findall(trecho)
+        if trecho.count("{") != len(itens) or trecho.count('"') != 8 * len(itens):
+            self._consume_items()
+            return
+        self._add(itens)
+        self._buffer = self._buffer[corte:]
+        if fim >= 0:
+            self._close_array()
+
+    def _consume_items(self) -> None:
+        buffer, pos, itens = self._buffer, 0, []
+        while True:
+            while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == "]":
+                self._add(itens)
+                self._buffer = buffer[pos:]
+                self._close_array()
+                return
+            try:
+                item, pos = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # Item incompleto: continua no próximo bloco
+            if not isinstance(item, dict):
+                raise ValueError(f'Item inesperado em "data": {item!r}')
+            itens.append(tuple("" if item.get(k) is None else str(item[k]) for k in ("date", "value")))
+        self._add(itens)
+        self._buffer = buffer[pos:]
+
+    def _close_array(self) -> None:
+        self._tail = self._buffer[1:]
+        self._buffer = ""
+
+    def _add(self, itens: list) -> None:
+        if not itens:
+            return
+        datas, valores = zip(*itens)
+        self._dates.append(_to_dates(datas))
+        self._values.append(_to_values(valores))
+
+
+def read_series(chunks: Iterable[bytes]) -> Tuple[np.ndarray, np.ndarray, dict]:
+    """Lê uma resposta em blocos: (datas, valores, demais campos)."""
+    parser = SeriesStreamParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    dates, values = parser.close()
+    return dates, values, parser.metadata()
@@ -0,0 +1,282 @@
+# maps.py
+"""Mapa de produtividade (folium).
+
+folium, branca e streamlit_folium são importados só dentro das funções: o
+custo (~0,8 s) fica com a primeira abertura da aba do mapa, não com o start.
+
+A geometria dos estados não passa pelo st_folium: o navegador a busca uma vez
+em app/static (ver `geodata.publish_geodata`) e guarda na janela do
+componente. A cada rerun só vão os marcadores e a tabela sigla -> (valor, cor)
+da variável e safra escolhidas, então trocar a variável ou a safra só recolore
+os polígonos. As cores de todas as safras são classificadas de uma vez, numa
+escala única por variável (ver `period_classes`).
+"""
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from instrumentation import cache_probe, timed, track_cache
+
+if TYPE_CHECKING:
+    import folium
+
+# Mapeamento de tiles e suas atribuições
+TILE_LAYERS = {
+    "OpenStreetMap": {
+        "tiles": "OpenStreetMap",
+        "attr": '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+    },
+    "CartoDB DarkMatter": {
+        "tiles": "CartoDB dark_matter",
+        "attr": '&copy; <a href="https://www.carto.com/attributions">CARTO</a>'
+    },
+    "Stamen Terrain": {
+        "tiles": "Stamen Terrain",
+        "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>, under <a href="http://creativecommons.org/licenses/by/3.0">CC BY 3.0</a>. Data by <a href="http://openstreetmap.org">OpenStreetMap</a>, under <a href="http://www.openstreetmap.org/copyright">ODbL</a>.'
+    }
+}
+
+# Estilo, popup e tooltip de cada ponto montados no navegador a partir das
+# propriedades compactas da feature (um único trecho de JS para a camada toda)
+_POINT_ON_EACH_FEATURE = """
+function(feature, layer) {
+    var p = feature.properties;
+    layer.setStyle({color: p.cor, fillColor: p.cor});
+    layer.setRadius(p.r);
+    layer.bindPopup('<b>' + p.uf + '</b><br>Produtividade: ' + p.prod
+        + ' sc/ha<br>Área: ' + p.area + ' mi ha');
+    layer.bindTooltip(p.uf);
+}
+"""
+
+# Coroplético montado no navegador: geometria do arquivo estático (baixada uma
+# vez por janela e versão) + valores/cores enviados a cada troca de variável.
+# A legenda acompanha a camada: entra e sai do mapa junto com ela.
+_CHOROPLETH_TEMPLATE = """
+{% macro script(this, kwargs) %}
+(function() {
+    var grupo = {{ this._parent.get_name() }};
+    var valores = {{ this.values|tojson }};
+    var rotulo = {{ this.label|tojson }};
+    var base = location.href.split('/component/')[0] + '/';
+    var url = new URL('app/static/' + {{ this.path|tojson }}, base).href;
+    var cache = window.agrotechGeometrias = window.agrotechGeometrias || {};
+    cache[url] = cache[url] || fetch(url).then(function(r) { return r.json(); });
+    cache[url].then(function(geo) {
+        L.geoJson(geo, {
+            style: function(f) {
+                var v = valores[f.properties.sigla];
+                return {fillColor: v ? v[1] : '#808080', color: 'white', weight: 1, fillOpacity: 0.7};
+            },
+            onEachFeature: function(f, layer) {
+                var v = valores[f.properties.sigla];
+                layer.bindTooltip('<b>' + f.properties.sigla + '</b> ' + f.properties.nome
+                    + '<br>' + rotulo + ': ' + (v ? v[0].toLocaleString('pt-BR') : 'sem dados'));
+            }
+        }).addTo(grupo).bringToBack();  // Chega depois dos marcadores: fica por baixo deles
+    });
+
+    var legenda = L.control({position: 'bottomright'});
+    legenda.onAdd = function() {
+        var div = L.DomUtil.create('div', 'info legend');
+        div.style.cssText = 'background: rgba(255,255,255,0.85); padding: 6px 8px; font: 12px sans-serif; color: #222;';
+        div.innerHTML = '<b>' + rotulo + '</b><br>' + {{ this.legend|tojson }}.map(function(faixa) {
+            return '<i style="display:inline-block;width:12px;height:12px;background:' + faixa[1]
+                + '"></i> ' + faixa[0].toLocaleString('pt-BR');
+        }).join('<br>');
+        return div;
+    };
+    grupo.on('add', function(e) { legenda.addTo(e.target._map); });
+    grupo.on('remove', function() { legenda.remove(); });
+})();
+{% endmacro %}
+"""
+
+# Os mapas em cache são compartilhados entre sessões e o st_folium altera o
+# objeto ao renderizar (anexa a camada dinâmica): uma renderização por vez.
+_render_lock = threading.Lock()
+
+
+def variable_colormap(df_mapa: pd.DataFrame, variavel: str):
+    """Escala em 10 faixas sobre o intervalo da variável (todas as linhas)."""
+    from branca.colormap import LinearColormap
+
+    return LinearColormap(
+        colors=['#ff0000', '#ffff00', '#00ff00'],
+        vmin=df_mapa[variavel].min(),
+        vmax=df_mapa[variavel].max()
+    ).to_step(n=10)
+
+
+def step_colors(colormap, values) -> np.ndarray:
+    """Versão vetorizada de `colormap(valor)` para um StepColormap."""
+    palette = np.array([colormap.rgb_hex_str(v) for v in colormap.index[:-1]])
+    idx = np.searchsorted(colormap.index, np.asarray(values, dtype=float), side='right') - 1
+    return palette[np.clip(idx, 0, len(palette) - 1)]
+
+
+def point_layer(df: pd.DataFrame, colors, name: str = "Marcadores") -> "folium.GeoJson":
+    """Marcadores circulares em uma única FeatureCollection de pontos.
+
+    Cores e raios são calculados sobre as colunas inteiras (sem iterrows) e cada
+    ponto carrega só coordenadas e os valores exibidos, então o HTML gerado
+    cresce linearmente e pouco por ponto, mesmo com dezenas de milhares de linhas.
+
+    Args:
+        df (pd.DataFrame): Colunas Estado, Lat, Lon, Produtividade (sc/ha)
+            e Área Cultivada (mi ha)
+        colors: Cor de cada linha (ex: classificação de `period_classes`)
+        name (str, optional): Nome da camada. Defaults to "Marcadores".
+    """
+    import folium
+    from folium.utilities import JsCode
+
+    produtividade = df['Produtividade (sc/ha)'].to_numpy(dtype=float)
+    area = df['Área Cultivada (mi ha)'].to_numpy(dtype=float)
+    colunas = zip(
+        np.round(df['Lon'].to_numpy(dtype=float), 5).tolist(),
+        np.round(df['Lat'].to_numpy(dtype=float), 5).tolist(),
+        df['Estado'].astype(str).tolist(),
+        produtividade.tolist(),
+        area.tolist(),
+        np.round(area * 2, 2).tolist(),  # Ajuste visual
+        list(colors),
+    )
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {"uf": uf, "prod": prod, "area": ar, "r": r, "cor": cor},
+        }
+        for lon, lat, uf, prod, ar, r, cor in colunas
+    ]
+    return folium.GeoJson(
+        {"type": "FeatureCollection", "features": features},
+        name=name,
+        marker=folium.CircleMarker(fill=True, fill_opacity=0.7),
+        on_each_feature=JsCode(_POINT_ON_EACH_FEATURE)
+    )
+
+
+@track_cache("mapa:base")
+@st.cache_resource(max_entries=16, show_spinner=False)
+@cache_probe("mapa:base")
+def build_base_map(mapa_base: str) -> "folium.Map":
+    """Mapa base (tiles e escala), construído uma vez por base cartográfica e
+    reutilizado entre reruns e sessões. Não depende dos dados: trocar variável
+    ou período nunca recarrega o mapa no navegador.
+    """
+    import folium
+
+    tile_config = TILE_LAYERS.get(mapa_base, TILE_LAYERS["OpenStreetMap"])
+
+    m = folium.Map(
+        location=[-15, -55],
+        zoom_start=4,
+        tiles=tile_config["tiles"],
+        attr=tile_config["attr"],  # Atribuição correta
+        control_scale=True
+    )
+    return m
+
+
+@track_cache("mapa:classes")
+@st.cache_resource(max_entries=16, show_spinner=False)
+@cache_probe("mapa:classes")
+def period_classes(variavel: str, version: str, _df_periodos: pd.DataFrame) -> dict:
+    """Classificação de todas as safras numa escala única da variável.
+
+    A escala cobre o intervalo de todas as safras, então a mesma cor significa o
+    mesmo valor em qualquer período. Ela e a faixa de cada (safra, estado) são
+    calculadas uma vez por (variável, versão dos dados): percorrer as safras só
+    consulta o resultado.
+
+    Args:
+        variavel (str): Coluna classificada
+        version (str): Versão de `_df_periodos` (chave do cache)
+        _df_periodos (pd.DataFrame): Colunas Safra, Estado e `variavel`
+
+    Returns:
+        dict: "legenda" (faixas [limite, cor]) e "safras"
+            (safra -> {sigla: [valor, cor]})
+    """
+    colormap = variable_colormap(_df_periodos, variavel)
+    valores = _df_periodos[variavel].to_numpy(dtype=float)
+    safras = {}
+    for safra, uf, valor, cor in zip(_df_periodos['Safra'].astype(str), _df_periodos['Estado'].astype(str),
+                                     valores.tolist(), step_colors(colormap, valores).tolist()):
+        safras.setdefault(safra, {})[uf] = [valor, cor]
+    return {
+        "legenda": [[round(limite, 2), colormap.rgb_hex_str(limite)] for limite in colormap.index[:-1]],
+        "safras": safras,
+    }
+
+
+def choropleth_colors(geometry_path: str, values: dict, legend: list, label: str):
+    """Elemento que pinta a geometria estática com valores já classificados.
+
+    Args:
+        geometry_path (str): Arquivo em app/static (ver `geodata.publish_geodata`)
+        values (dict): sigla -> [valor, cor]
+        legend (list): Faixas [limite, cor] da escala
+        label (str): Nome da variável (tooltip e legenda)
+    """
+    from branca.element import MacroElement
+    from folium.template import Template
+
+    elemento = MacroElement()
+    elemento._name = "ChoroplethColors"
+    elemento._template = Template(_CHOROPLETH_TEMPLATE)
+    elemento.path = geometry_path
+    elemento.label = label
+    elemento.values = values
+    elemento.legend = legend
+    return elemento
+
+
+@track_cache("mapa:estados")
+@st.cache_resource(max_entries=64, show_spinner=False)
+@cache_probe("mapa:estados")
+def build_state_layer(variavel: str, version: str, periodo: str, geometry_path: str,
+                      _df_periodos: pd.DataFrame) -> "folium.FeatureGroup":
+    """Camada dinâmica de uma safra: coroplético dos estados, marcadores e legenda.
+
+    Só leva valores e cores por estado (a geometria vem de `geometry_path`, que
+    já identifica nível de detalhe e versão), então é pequena e trocar a
+    variável, a safra ou o nível não reenvia polígonos. As cores vêm prontas de
+    `period_classes`. Estados sem dados na safra ficam em cinza.
+    """
+    import folium
+
+    classes = period_classes(variavel, version, _df_periodos)
+    valores = classes["safras"].get(periodo, {})
+    safra = _df_periodos[_df_periodos['Safra'].astype(str) == periodo]
+    camada = folium.FeatureGroup(name="Estados")
+    choropleth_colors(geometry_path, valores, classes["legenda"], variavel).add_to(camada)
+    cores = [valores[uf][1] for uf in safra['Estado'].astype(str)]
+    point_layer(safra, cores).add_to(camada)
+    return camada
+
+
+@timed("mapa:st_folium")
+def render_map(m: "folium.Map", camada: "folium.FeatureGroup", **kwargs) -> dict:
+    """Exibe o mapa em cache com a camada dinâmica sem corromper o cache."""
+    import folium
+    from streamlit_folium import st_folium
+
+    controle = folium.LayerControl()
+    with _render_lock:
+        try:
+            return st_folium(
+                m,
+                feature_group_to_add=camada,
+                layer_control=controle,
+                **kwargs
+            )
+        finally:
+            # st_folium anexa a camada e o controle como filhos do mapa; sem
+            # removê-los o próximo rerun enviaria os polígonos duas vezes
+            for filho in (camada, controle):
+                m._children.pop(filho.get_name(), None)
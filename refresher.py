@@ -0,0 +1,97 @@
+# refresher.py
+"""Atualização das fontes em segundo plano (stale-while-revalidate).
+
+Uma thread por processo verifica periodicamente cada fonte registrada e a
+atualiza antes de vencer. O caminho da requisição só lê o último snapshot
+completo (histórico gravado, GeoJSON gerado) e, se ele estiver velho, apenas
+acorda a thread: nenhum usuário espera pela rede enquanto houver dados locais.
+"""
+import logging
+import threading
+import time
+from typing import Callable
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """Executa tarefas de atualização registradas quando ficam vencidas.
+
+    Features:
+    - Thread daemon única, iniciada sob demanda (`start` é idempotente)
+    - `trigger` antecipa a próxima verificação (ex: usuário encontrou dado velho)
+    - Falhas são registradas em log e reagendadas com backoff exponencial,
+      sem derrubar a thread nem chegar ao usuário
+    """
+
+    def __init__(self, interval: float = None, max_backoff: float = None):
+        self.interval = Config.REFRESH_INTERVAL if interval is None else interval
+        self.max_backoff = Config.COMMODITY_REFRESH_SECONDS if max_backoff is None else max_backoff
+        self._jobs = {}
+        self._failures = {}
+        self._retry_at = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.last_errors = {}
+
+    def register(self, key: str, func: Callable[[], object], is_due: Callable[[], bool]) -> None:
+        """Registra (ou substitui) a tarefa `key`.
+
+        Args:
+            key (str): Identificador da fonte (ex: nome da commodity)
+            func (Callable): Atualiza a fonte; o resultado é ignorado
+            is_due (Callable): True quando a fonte precisa ser atualizada
+        """
+        with self._lock:
+            self._jobs[key] = (func, is_due)
+
+    def is_registered(self, key: str) -> bool:
+        return key in self._jobs
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="agrotech-refresher", daemon=True)
+            self._thread.start()
+
+    def trigger(self) -> None:
+        """Acorda a thread para verificar as fontes agora."""
+        self.start()
+        self._wake.set()
+
+    def run_once(self) -> None:
+        """Atualiza, em sequência, as tarefas vencidas que não estão em backoff."""
+        with self._lock:
+            jobs = list(self._jobs.items())
+        agora = time.monotonic()
+        for key, (func, is_due) in jobs:
+            if self._retry_at.get(key, 0) > agora:
+                continue
+            try:
+                if not is_due():
+                    continue
+                func()
+            except Exception as e:
+                falhas = self._failures.get(key, 0) + 1
+                self._failures[key] = falhas
+                espera = min(self.max_backoff, self.interval * 2 ** falhas)
+                self._retry_at[key] = time.monotonic() + espera
+                self.last_errors[key] = str(e)
+                logger.warning("Falha ao atualizar %s (nova tentativa em %.0fs): %s", key, espera, e)
+            else:
+                self._failures.pop(key, None)
+                self._retry_at.pop(key, None)
+                self.last_errors.pop(key, None)
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.clear()
+            self.run_once()
+            self._wake.wait(self.interval)
+
+
+refresher = BackgroundRefresher()
@@ -0,0 +1,253 @@
+# spatial.py
+"""Junção espacial de pontos de produtividade com os polígonos das regiões.
+
+Cada ponto (lavoura/talhão com coordenadas) é atribuído à sua região por uma
+consulta em lote no STRtree, o mesmo índice usado internamente pelo
+`geopandas.sjoin`, mas sem montar GeoDataFrames. A agregação por região é
+feita com `numpy.bincount`. O resultado, no formato do `df_mapa` com uma linha por
+(safra, região), alimenta os marcadores e o coroplético de cada período e fica
+em cache por versão dos dados.
+
+Pontos com código de município têm também uma tabela por (safra, município),
+agregada só pelo código (sem geometria municipal).
+"""
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import Config
+from dataplane import shared_dataset
+from geodata import geodata_version, load_state_geojson
+
+# Colunas obrigatórias da base de pontos (produtividade em sc/ha, área em ha)
+POINT_COLUMNS = ["lon", "lat", "produtividade", "area_ha"]
+
+# Colunas opcionais: safra (ex: "2023/24") e código IBGE do município
+PERIOD_COLUMN = "safra"
+MUNICIPALITY_COLUMN = "municipio"
+
+# Safra atribuída a bases sem a coluna `safra`
+CURRENT_PERIOD = "Atual"
+
+# Pontos por consulta ao índice (limita a memória das geometrias temporárias)
+CHUNK_POINTS = 1_000_000
+
+
+class RegionIndex:
+    """STRtree sobre os polígonos de uma FeatureCollection de regiões."""
+
+    def __init__(self, geojson: dict, key: str = "sigla"):
+        import shapely
+
+        features = geojson["features"]
+        self.codes = np.array([f["properties"][key] for f in features], dtype=object)
+        self.properties = [f["properties"] for f in features]
+        self.geometries = shapely.from_geojson([json.dumps(f["geometry"]) for f in features])
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def assign(self, lon, lat, chunk: int = CHUNK_POINTS) -> np.ndarray:
+        """Posição da região de cada ponto (-1 se cair fora de todas).
+
+        O STRtree filtra os candidatos pelo envelope e o teste exato roda uma vez
+        por região, vetorizado sobre os seus candidatos (`contains_xy` com o
+        polígono preparado): testar ponto a ponto contra polígonos de milhares
+        de vértices é ordens de grandeza mais lento.
+        """
+        import shapely
+
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        regiao = np.full(len(lon), -1, dtype=np.int64)
+        for inicio in range(0, len(lon), chunk):
+            x, y = lon[inicio:inicio + chunk], lat[inicio:inicio + chunk]
+            idx_ponto, idx_regiao = self.tree.query(shapely.points(x, y))
+            ordem = np.argsort(idx_regiao, kind="stable")
+            idx_ponto, idx_regiao = idx_ponto[ordem], idx_regiao[ordem]
+            regioes, cortes = np.unique(idx_regiao, return_index=True)
+            for r, de, ate in zip(regioes, cortes, np.append(cortes[1:], len(idx_regiao))):
+                candidatos = idx_ponto[de:ate]
+                dentro = shapely.contains_xy(self.geometries[r], x[candidatos], y[candidatos])
+                destino = inicio + candidatos[dentro]
+                # Ponto sobre divisa: fica com a primeira região encontrada
+                destino = destino[regiao[destino] < 0]
+                regiao[destino] = r
+        return regiao
+
+    def locate(self, lon: float, lat: float) -> Optional[int]:
+        """Posição da região que contém o ponto, ou None (consulta pontual, < 1 ms)."""
+        import shapely
+
+        for candidato in self.tree.query(shapely.points(lon, lat)):
+            if shapely.contains_xy(self.geometries[candidato], lon, lat):
+                return int(candidato)
+        return None
+
+    def anchors(self) -> np.ndarray:
+        """Ponto interno de cada polígono (lon, lat), usado para os marcadores."""
+        import shapely
+
+        return shapely.get_coordinates(shapely.point_on_surface(self.geometries))
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def region_index(level: str = "alta", version: str = None) -> RegionIndex:
+    """Índice das regiões do GeoJSON pré-processado, um por (nível, versão do índice)."""
+    return RegionIndex(load_state_geojson(level))
+
+
+def region_at(lon: float, lat: float, level: str = "alta") -> Optional[str]:
+    """Sigla da região sob a coordenada (ex: clique no mapa), ou None."""
+    indice = region_index(level, geodata_version())
+    posicao = indice.locate(lon, lat)
+    return None if posicao is None else indice.codes[posicao]
+
+
+def _periods(dados: pd.DataFrame):
+    """(safras em ordem, posição da safra de cada ponto); pontos sem safra
+    contam como `CURRENT_PERIOD`."""
+    if PERIOD_COLUMN not in dados:
+        return np.array([CURRENT_PERIOD], dtype=object), np.zeros(len(dados), dtype=np.int64)
+    safra = dados[PERIOD_COLUMN].astype("string").fillna(CURRENT_PERIOD)
+    periodos, posicao = np.unique(safra.to_numpy(dtype=object), return_inverse=True)
+    return periodos.astype(object), posicao.astype(np.int64)
+
+
+def aggregate_points(index: RegionIndex, points: pd.DataFrame) -> pd.DataFrame:
+    """Agrega os pontos por safra e região, no formato do `df_mapa`.
+
+    A junção espacial roda uma vez para todas as safras: a agregação usa a
+    chave combinada safra * regiões + região num único `bincount`.
+
+    Returns:
+        pd.DataFrame: Safra, Estado, Produtividade (sc/ha) (média ponderada pela
+            área), Área Cultivada (mi ha), Lat, Lon (ponto interno da região) e
+            Pontos, só para (safra, região) com pelo menos um ponto
+    """
+    colunas = POINT_COLUMNS + [PERIOD_COLUMN] * (PERIOD_COLUMN in points)
+    dados = points[colunas].dropna(subset=POINT_COLUMNS)
+    regiao = index.assign(dados["lon"].to_numpy(), dados["lat"].to_numpy())
+    dentro = regiao >= 0
+    periodos, periodo = _periods(dados)
+
+    n = len(index)
+    chave = periodo[dentro] * n + regiao[dentro]
+    area = dados["area_ha"].to_numpy(dtype=float)[dentro]
+    produtividade = dados["produtividade"].to_numpy(dtype=float)[dentro]
+
+    total = n * len(periodos)
+    contagem = np.bincount(chave, minlength=total)
+    soma_area = np.bincount(chave, weights=area, minlength=total)
+    soma_prod = np.bincount(chave, weights=produtividade * area, minlength=total)
+
+    presentes = np.flatnonzero(contagem)
+    periodo, regiao = np.divmod(presentes, n)
+    ancoras = index.anchors()[regiao]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = soma_prod[presentes] / soma_area[presentes]
+    return pd.DataFrame({
+        "Safra": periodos[periodo],
+        "Estado": index.codes[regiao],
+        "Produtividade (sc/ha)": media.round(1),
+        "Área Cultivada (mi ha)": (soma_area[presentes] / 1e6).round(2),
+        "Lat": ancoras[:, 1],
+        "Lon": ancoras[:, 0],
+        "Pontos": contagem[presentes],
+    })
+
+
+def aggregate_municipalities(points: pd.DataFrame) -> pd.DataFrame:
+    """Agrega os pontos por safra e código de município (vazio sem a coluna).
+
+    Returns:
+        pd.DataFrame: Safra, Município, Produtividade (sc/ha), Área Cultivada (ha)
+            e Pontos
+    """
+    if MUNICIPALITY_COLUMN not in points:
+        return pd.DataFrame(columns=["Safra", "Município", "Produtividade (sc/ha)",
+                                     "Área Cultivada (ha)", "Pontos"])
+    colunas = ["produtividade", "area_ha", MUNICIPALITY_COLUMN] + [PERIOD_COLUMN] * (PERIOD_COLUMN in points)
+    # Sem município o ponto não tem onde entrar; sem safra entra como CURRENT_PERIOD
+    dados = points[colunas].dropna(subset=["produtividade", "area_ha", MUNICIPALITY_COLUMN])
+    periodos, periodo = _periods(dados)
+    dados = dados.assign(Safra=periodos[periodo], ponderada=dados["produtividade"] * dados["area_ha"])
+    grupos = dados.groupby(["Safra", MUNICIPALITY_COLUMN], sort=True)
+    tabela = grupos.agg(ponderada=("ponderada", "sum"), area=("area_ha", "sum"), Pontos=("area_ha", "size"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = tabela["ponderada"] / tabela["area"]
+    return pd.DataFrame({
+        "Produtividade (sc/ha)": media.round(1),
+        "Área Cultivada (ha)": tabela["area"].round(1),
+        "Pontos": tabela["Pontos"],
+    }).reset_index().rename(columns={MUNICIPALITY_COLUMN: "Município"})
+
+
+def points_version(path: str = None) -> Optional[str]:
+    """Versão da base de pontos (None se o arquivo não existe)."""
+    path = Path(path or Config.YIELD_POINTS_FILE)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return hashlib.sha1(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+
+
+def read_points(path: str = None) -> pd.DataFrame:
+    """Lê a base de pontos (.parquet ou .csv) só com as colunas usadas
+    (as opcionais, safra e município, quando existem no arquivo)."""
+    path = Path(path or Config.YIELD_POINTS_FILE)
+    opcionais = [PERIOD_COLUMN, MUNICIPALITY_COLUMN]
+    # Códigos (município, safra) lidos como texto: "5300108" e "2023/24" não viram
+    # números; dtype "string" mantém os vazios como <NA> em vez do texto "nan"
+    texto = {coluna: "string" for coluna in opcionais}
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        nomes = pq.read_schema(path).names
+        pontos = pd.read_parquet(path, columns=POINT_COLUMNS + [c for c in opcionais if c in nomes])
+        return pontos.astype({c: "string" for c in opcionais if c in pontos})
+    colunas = set(POINT_COLUMNS + opcionais)
+    return pd.read_csv(path, usecols=lambda c: c in colunas, dtype=texto)
+
+
+@shared_dataset(max_entries=4)
+def regional_yields(path: str, version: str, geo_version: str = None, level: str = "alta") -> pd.DataFrame:
+    """Indicadores por safra e região a partir da base de pontos, em cache por
+    (versão dos pontos, versão das geometrias).
+    """
+    return aggregate_points(region_index(level, geo_version), read_points(path))
+
+
+@shared_dataset(max_entries=4)
+def municipal_yields(path: str, version: str) -> pd.DataFrame:
+    """Indicadores por safra e município, em cache por versão dos pontos."""
+    return aggregate_municipalities(read_points(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agrega pontos de produtividade por estado")
+    parser.add_argument("source", nargs="?", default=Config.YIELD_POINTS_FILE,
+                        help="Base de pontos (.parquet/.csv com lon, lat, produtividade, area_ha)")
+    parser.add_argument("--level", default="alta", help="Nível de detalhe das geometrias")
+    parser.add_argument("--municipios", action="store_true",
+                        help="Mostra também a tabela por município (coluna municipio)")
+    args = parser.parse_args()
+
+    pontos = read_points(args.source)
+    inicio = time.perf_counter()
+    indice = RegionIndex(load_state_geojson(args.level))
+    tabela = aggregate_points(indice, pontos)
+    duracao = time.perf_counter() - inicio
+    print(tabela.to_string(index=False))
+    print(f"{len(pontos)} pontos em {duracao:.2f}s ({len(pontos) / duracao:,.0f} pontos/s), "
+          f"versão das geometrias {geodata_version()}")
+    if args.municipios:
+        print(aggregate_municipalities(pontos).to_string(index=False))
@@ -0,0 +1,319 @@
+# storage.py
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Sequence
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+from config import Config
+
+# Colunas gravadas: date (date32) e value (float32); partições commodity=<nome>/year=<ano>
+PARTITIONING = ds.partitioning(
+    pa.schema([("commodity", pa.string()), ("year", pa.int16())]),
+    flavor="hive"
+)
+# Por commodity: arquivos de cada ano, última data, linhas e versão ("_" no
+# início: fora da descoberta de arquivos do pyarrow)
+MANIFEST_FILE = "_manifest.json"
+
+
+class TimeSeriesStore:
+    """Séries temporais em Arrow IPC, particionadas por commodity e ano.
+
+    Features:
+    - Append-only: cada gravação cria novos arquivos; só a compactação de uma
+      partição com arquivos demais reescreve o seu conteúdo num arquivo único
+    - Manifesto por commodity (`MANIFEST_FILE`): lista os arquivos visíveis e
+      guarda última data, linhas e versão, então `version`/`last_date` não
+      varrem o disco e trocar o manifesto publica uma gravação de uma vez
+    - Consultas por (commodities, período) com filtro empurrado para o dataset:
+      só as partições/linhas do recorte são lidas
+    - Leitura memory-mapped, colunas date32/float32
+
+    As gravações de uma instância são serializadas por um lock; gravar a mesma
+    commodity a partir de processos diferentes ao mesmo tempo não é suportado
+    (o `ingest` já divide o trabalho por commodity).
+    """
+
+    def __init__(self, root: str = None):
+        self.root = Path(root or Config.COMMODITY_STORE_DIR)
+        self._fs = pafs.LocalFileSystem(use_mmap=True)
+        self._lock = threading.RLock()
+
+    def _dataset(self, commodities: Sequence[str] = None) -> Optional[ds.Dataset]:
+        if not self.root.exists():
+            return None
+        nomes = self._stored() if commodities is None else commodities
+        arquivos = [str(path) for nome in nomes for path in self._files(nome)]
+        if not arquivos:
+            return None
+        return ds.dataset(
+            arquivos,
+            format="ipc",
+            partitioning=PARTITIONING,
+            partition_base_dir=str(self.root),
+            filesystem=self._fs
+        )
+
+    def _commodity_dir(self, commodity: str) -> Path:
+        # Mesmo escape de URI usado pelo pyarrow nos nomes de partição
+        return self.root / f"commodity={quote(commodity, safe='')}"
+
+    def _stored(self) -> list:
+        """Commodities com diretório no armazenamento."""
+        if not self.root.exists():
+            return []
+        return [unquote(path.name.split("=", 1)[1]) for path in sorted(self.root.glob("commodity=*"))
+                if path.is_dir()]
+
+    def manifest(self, commodity: str) -> Optional[dict]:
+        """Manifesto da commodity (None se ainda não existe histórico).
+
+        Históricos gravados antes dos manifestos são varridos uma vez e o
+        manifesto resultante é gravado.
+        """
+        path = self._commodity_dir(commodity) / MANIFEST_FILE
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            if not self.exists(commodity):
+                return None
+        with self._lock:
+            if not path.exists():
+                self._write_manifest(commodity, self._scan(commodity))
+            return json.loads(path.read_text(encoding="utf-8"))
+
+    def _scan(self, commodity: str) -> dict:
+        base = self._commodity_dir(commodity)
+        manifesto = {"token": uuid.uuid4().hex, "files": {}, "retired": [], "rows": 0, "last_date": None}
+        for path in sorted(base.glob("year=*/*.arrow")):
+            manifesto["files"].setdefault(path.parent.name.split("=", 1)[1], []).append(path.name)
+        arquivos = self._files(commodity, manifesto)
+        if arquivos:
+            datas = ds.dataset([str(p) for p in arquivos], format="ipc", filesystem=self._fs) \
+                .to_table(columns=["date"]).column("date")
+            manifesto["rows"] = len(datas)
+            if len(datas):
+                manifesto["last_date"] = pc.max(datas).as_py().isoformat()
+        return manifesto
+
+    def _write_manifest(self, commodity: str, manifesto: dict) -> None:
+        # Arquivo temporário + os.replace: leitores veem o manifesto antigo ou o novo
+        path = self._commodity_dir(commodity) / MANIFEST_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporario = path.with_name(f".{MANIFEST_FILE}.{uuid.uuid4().hex}")
+        temporario.write_text(json.dumps(manifesto), encoding="utf-8")
+        os.replace(temporario, path)
+
+    def _files(self, commodity: str, manifesto: dict = None) -> list:
+        """Arquivos visíveis da commodity, segundo o manifesto."""
+        manifesto = manifesto or self.manifest(commodity)
+        if manifesto is None:
+            return []
+        base = self._commodity_dir(commodity)
+        return [base / f"year={ano}" / nome for ano, nomes in sorted(manifesto["files"].items()) for nome in nomes]
+
+    def commodities(self) -> list:
+        """Commodities com histórico gravado."""
+        return sorted(nome for nome in self._stored() if self.manifest(nome)["rows"])
+
+    def query(self, commodities: Sequence[str] = None, start=None, end=None) -> pd.DataFrame:
+        """Linhas (commodity, date, value) do recorte pedido, em formato longo.
+
+        Args:
+            commodities (Sequence[str], optional): Filtra commodities. Defaults to todas.
+            start (date-like, optional): Data inicial (inclusive). Defaults to None.
+            end (date-like, optional): Data final (inclusive). Defaults to None.
+        """
+        dataset = self._dataset(commodities)
+        if dataset is None:
+            return pd.DataFrame({
+                "commodity": pd.Series(dtype=object),
+                "date": pd.Series(dtype="datetime64[ms]"),
+                "value": pd.Series(dtype="float32"),
+            })
+
+        filtro = None
+        def _and(expr):
+            nonlocal filtro
+            filtro = expr if filtro is None else filtro & expr
+
+        if commodities is not None:
+            # Tipo explícito: uma lista vazia viraria array nulo (ArrowTypeError)
+            _and(ds.field("commodity").isin(pa.array(list(commodities), pa.string())))
+        if start is not None:
+            inicio = pd.Timestamp(start).date()
+            _and(ds.field("year") >= inicio.year)  # Poda de partições
+            _and(ds.field("date") >= pa.scalar(inicio, pa.date32()))
+        if end is not None:
+            fim = pd.Timestamp(end).date()
+            _and(ds.field("year") <= fim.year)
+            _and(ds.field("date") <= pa.scalar(fim, pa.date32()))
+
+        table = dataset.to_table(columns=["commodity", "date", "value"], filter=filtro)
+        df = table.to_pandas(date_as_object=False)
+        return df.sort_values(["commodity", "date"], ignore_index=True)
+
+    def query_wide(self, commodities: Sequence[str] = None, start=None, end=None) -> pd.DataFrame:
+        """Mesmo recorte de `query`, pivotado: índice `Data`, uma coluna por commodity."""
+        longo = self.query(commodities, start, end)
+        wide = longo.pivot_table(index="date", columns="commodity", values="value", aggfunc="last")
+        if commodities is not None:
+            wide = wide.reindex(columns=[c for c in commodities if c in wide.columns])
+        wide.index.name = "Data"
+        wide.columns.name = None
+        return wide
+
+    def exists(self, commodity: str) -> bool:
+        return self._commodity_dir(commodity).exists()
+
+    def read(self, commodity: str) -> Optional[pd.DataFrame]:
+        """Histórico (date, value) de uma commodity ou None se ainda não existe."""
+        if not self.exists(commodity):
+            return None
+        return self.query([commodity]).drop(columns="commodity")
+
+    def last_date(self, commodity: str) -> Optional[pd.Timestamp]:
+        manifesto = self.manifest(commodity)
+        if manifesto is None or manifesto["last_date"] is None:
+            return None
+        return pd.Timestamp(manifesto["last_date"])
+
+    def age(self, commodity: str) -> Optional[float]:
+        """Segundos desde a última atualização (None se não houver histórico)."""
+        path = self._commodity_dir(commodity)
+        if not path.exists():
+            return None
+        return time.time() - path.stat().st_mtime
+
+    def is_fresh(self, commodity: str, max_age: float = None) -> bool:
+        max_age = Config.COMMODITY_REFRESH_SECONDS if max_age is None else max_age
+        age = self.age(commodity)
+        return age is not None and age < max_age
+
+    def append(self, commodity: str, df: pd.DataFrame) -> int:
+        """Grava as linhas (date, value) como novos arquivos nas partições do ano.
+
+        Os arquivos são escritos num diretório oculto e movidos para as partições
+        já completos; as consultas só os enxergam quando o manifesto novo
+        substitui o antigo, então leitores concorrentes veem snapshots inteiros.
+        Partições que passam de `Config.STORE_COMPACT_FILES` arquivos são
+        compactadas na mesma gravação.
+
+        Returns:
+            int: Linhas gravadas
+        """
+        if df.empty:
+            return 0
+        datas = pd.to_datetime(df['date'])
+        table = pa.table({
+            "date": pa.array(datas.dt.date, pa.date32()),
+            "value": pa.array(df['value'].to_numpy(dtype="float32")),
+            "commodity": pa.array([commodity] * len(df), pa.string()),
+            "year": pa.array(datas.dt.year.to_numpy(dtype="int16")),
+        })
+        staging = self.root / f".staging-{uuid.uuid4().hex}"
+        try:
+            ds.write_dataset(
+                table,
+                str(staging),
+                format="ipc",
+                partitioning=PARTITIONING,
+                basename_template=f"part-{uuid.uuid4().hex}-{{i}}.arrow"
+            )
+            with self._lock:
+                manifesto = self.manifest(commodity) or {
+                    "token": "", "files": {}, "retired": [], "rows": 0, "last_date": None}
+                for arquivo in staging.rglob("*.arrow"):
+                    destino = self.root / arquivo.relative_to(staging)
+                    destino.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(arquivo, destino)
+                    manifesto["files"].setdefault(destino.parent.name.split("=", 1)[1], []).append(destino.name)
+                for ano, nomes in manifesto["files"].items():
+                    if len(nomes) > Config.STORE_COMPACT_FILES:
+                        self._compact(commodity, manifesto, ano)
+                self._purge(commodity, manifesto)
+                ultima = datas.max().date().isoformat()
+                manifesto["last_date"] = max(filter(None, [manifesto["last_date"], ultima]))
+                manifesto["rows"] += len(df)
+                manifesto["token"] = uuid.uuid4().hex
+                self._write_manifest(commodity, manifesto)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        os.utime(self._commodity_dir(commodity))
+        return len(df)
+
+    def _compact(self, commodity: str, manifesto: dict, ano: str) -> None:
+        """Reescreve os arquivos de uma partição num só (ordenado por data).
+
+        Os antigos saem do manifesto mas só são apagados depois de
+        `Config.STORE_RETIRED_SECONDS`, por `_purge`.
+        """
+        pasta = self._commodity_dir(commodity) / f"year={ano}"
+        antigos = manifesto["files"][ano]
+        table = ds.dataset([str(pasta / nome) for nome in antigos], format="ipc", filesystem=self._fs) \
+            .to_table(columns=["date", "value"]).sort_by("date")
+        nome = f"part-{uuid.uuid4().hex}-0.arrow"
+        temporario = pasta / f".{nome}"
+        with pa.OSFile(str(temporario), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temporario, pasta / nome)
+        manifesto["files"][ano] = [nome]
+        agora = time.time()
+        manifesto["retired"] += [[f"year={ano}/{antigo}", agora] for antigo in antigos]
+
+    def _purge(self, commodity: str, manifesto: dict) -> None:
+        """Apaga os arquivos compactados há mais de `Config.STORE_RETIRED_SECONDS`."""
+        limite = time.time() - Config.STORE_RETIRED_SECONDS
+        base = self._commodity_dir(commodity)
+        restantes = []
+        for relativo, quando in manifesto["retired"]:
+            if quando < limite:
+                (base / relativo).unlink(missing_ok=True)
+            else:
+                restantes.append([relativo, quando])
+        manifesto["retired"] = restantes
+
+    def merge(self, commodity: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Anexa ao histórico apenas as linhas mais novas que a última data
+        gravada (lida do manifesto, sem ler o histórico)."""
+        ultima = self.last_date(commodity)
+        novos = df if ultima is None else df[df['date'] > ultima]
+        if novos.empty:
+            # Nada novo na API: só renova o carimbo de atualização
+            if self.exists(commodity):
+                os.utime(self._commodity_dir(commodity))
+        else:
+            self.append(commodity, novos[['date', 'value']])
+        return self.read(commodity)
+
+    def version(self, commodity: str = None) -> str:
+        """Identificador do conteúdo atual (muda a cada gravação), para chaves de cache.
+
+        Args:
+            commodity (str, optional): Restringe ao histórico de uma commodity.
+                Defaults to todo o armazenamento.
+        """
+        if commodity is not None:
+            manifesto = self.manifest(commodity)
+            return "vazio" if manifesto is None else manifesto["token"][:12]
+        nomes = self._stored()
+        if not nomes:
+            return "vazio"
+        assinatura = hashlib.sha1()
+        for nome in nomes:
+            assinatura.update(f"{nome}:{self.manifest(nome)['token']}".encode())
+        return assinatura.hexdigest()[:12]
+
+
+timeseries_store = TimeSeriesStore()
@@ -0,0 +1,11 @@
+from benchmarks.import_time import LAZY_MODULES, STARTUP_MODULES, lazy_loaded, measure
+
+
+def test_startup_does_not_import_lazy_modules():
+    assert "streamlit" in STARTUP_MODULES
+    assert lazy_loaded(measure()) == []
+
+
+def test_lazy_loaded_detects_submodules():
+    assert lazy_loaded([("shapely.geometry", 1, 0.1), ("pandas", 0, 0.2)]) == ["shapely"]
+    assert set(LAZY_MODULES) >= {"geopandas", "statsmodels"}
@@ -0,0 +1,37 @@
+import time
+
+import pytest
+
+from api_connector import RateLimitError, TokenBucket, acquire_all
+
+
+def test_exhausted_day_rejects_before_waiting_on_minute():
+    minuto = TokenBucket(1, 60)
+    dia = TokenBucket(1, 24 * 3600)
+    acquire_all([minuto, dia], timeout=120)  # Consome o único token de cada um
+
+    # Minuto precisaria de ~60s (dentro do prazo), dia esgotado (fora dele)
+    inicio = time.monotonic()
+    with pytest.raises(RateLimitError):
+        acquire_all([minuto, dia], timeout=120)
+    assert time.monotonic() - inicio < 1
+    # A recusa devolve a reserva do minuto: o saldo não fica negativo
+    assert minuto._tokens > -1e-3
+    assert dia._tokens > -1e-3
+
+
+def test_waits_once_for_the_slowest_bucket():
+    rapido = TokenBucket(1, 0.2)
+    lento = TokenBucket(1, 0.4)
+    acquire_all([rapido, lento])
+    inicio = time.monotonic()
+    acquire_all([rapido, lento], timeout=1)
+    assert 0.3 < time.monotonic() - inicio < 0.6
+
+
+def test_acquire_refunds_on_timeout():
+    bucket = TokenBucket(1, 60)
+    bucket.acquire()
+    with pytest.raises(RateLimitError):
+        bucket.acquire(timeout=1)
+    assert bucket._tokens > -1e-3
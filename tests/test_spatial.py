@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import grid_geojson
+from spatial import CURRENT_PERIOD, RegionIndex, aggregate_municipalities, aggregate_points, read_points
+
+
+def _pontos():
+    # Três pontos no centro da primeira célula da grade, um deles sem safra
+    indice = RegionIndex(grid_geojson(4))
+    oeste, sul, leste, norte = grid_geojson(4)["features"][0]["bbox"]
+    return indice, pd.DataFrame({
+        "lon": [(oeste + leste) / 2] * 3,
+        "lat": [(sul + norte) / 2] * 3,
+        "produtividade": [50.0, 60.0, 70.0],
+        "area_ha": [100.0, 100.0, 100.0],
+        "safra": pd.array(["2022/23", "2022/23", None], dtype="string"),
+        "municipio": pd.array(["5300108", None, "5300108"], dtype="string"),
+    })
+
+
+def test_aggregate_points_null_safra_is_current_period():
+    indice, pontos = _pontos()
+    tabela = aggregate_points(indice, pontos)
+    assert sorted(tabela["Safra"]) == sorted(["2022/23", CURRENT_PERIOD])
+    assert "nan" not in set(tabela["Safra"])
+    assert tabela["Pontos"].sum() == 3
+
+
+def test_aggregate_municipalities_drops_null_municipio():
+    _, pontos = _pontos()
+    tabela = aggregate_municipalities(pontos)
+    assert set(tabela["Município"]) == {"5300108"}
+    assert set(tabela["Safra"]) == {"2022/23", CURRENT_PERIOD}
+    assert tabela["Pontos"].sum() == 2
+
+
+def test_read_points_keeps_nulls(tmp_path):
+    _, pontos = _pontos()
+    for arquivo in (tmp_path / "pontos.parquet", tmp_path / "pontos.csv"):
+        if arquivo.suffix == ".parquet":
+            pontos.to_parquet(arquivo)
+        else:
+            pontos.to_csv(arquivo, index=False)
+        lidos = read_points(str(arquivo))
+        assert lidos["safra"].isna().sum() == 1
+        assert lidos["municipio"].isna().sum() == 1
+        assert not np.isin(["nan", "None"], lidos["safra"].dropna()).any()
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from config import Config
+from storage import MANIFEST_FILE, TimeSeriesStore
+
+
+def _dias(inicio, n):
+    return pd.DataFrame({"date": pd.date_range(inicio, periods=n, freq="D"), "value": range(n)})
+
+
+def test_manifest_tracks_appends(tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    assert store.version("WHEAT") == "vazio"
+    store.append("WHEAT", _dias("2020-12-30", 5))
+    versao = store.version("WHEAT")
+    assert store.last_date("WHEAT") == pd.Timestamp("2021-01-03")
+    assert store.manifest("WHEAT")["rows"] == 5
+
+    store.merge("WHEAT", _dias("2021-01-01", 5))
+    assert store.version("WHEAT") != versao
+    assert store.last_date("WHEAT") == pd.Timestamp("2021-01-05")
+    assert len(store.read("WHEAT")) == 7
+    assert store.commodities() == ["WHEAT"]
+
+
+def test_compaction_keeps_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "STORE_COMPACT_FILES", 3)
+    monkeypatch.setattr(Config, "STORE_RETIRED_SECONDS", 0)
+    store = TimeSeriesStore(tmp_path)
+    for i in range(10):
+        store.append("CORN", _dias(pd.Timestamp("2021-01-01") + pd.Timedelta(days=i), 1))
+    arquivos = store.manifest("CORN")["files"]["2021"]
+    assert len(arquivos) <= 3
+    historico = store.read("CORN")
+    assert len(historico) == 10 and historico["date"].is_monotonic_increasing
+    # Os compactados saem do disco depois do prazo
+    assert len(list((tmp_path / "commodity=CORN" / "year=2021").glob("*.arrow"))) == len(arquivos)
+
+
+def test_store_without_manifest_is_scanned(tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    store.append("SOY BEAN", _dias("2022-01-01", 3))
+    (tmp_path / "commodity=SOY%20BEAN" / MANIFEST_FILE).unlink()
+    assert store.last_date("SOY BEAN") == pd.Timestamp("2022-01-03")
+    assert store.manifest("SOY BEAN")["rows"] == 3
+    assert len(store.query(["SOY BEAN"])) == 3